@@ -1,10 +1,17 @@
-import tkinter
-import customtkinter
+import sys
 
-from gui import ViewerAppWindow
 from utils.log_handler import logger
 
+log = logger.get_logger(__name__)
+
 if __name__ == "__main__":
-    logger.print_log("[INFO] Starting S1_IOC_manager v1")
+    # With arguments the tool runs headless, the GUI modules (and tkinter) are only imported without them
+    if len(sys.argv) > 1:
+        from cli import main
+        sys.exit(main(sys.argv[1:]))
+
+    from gui import ViewerAppWindow
+
+    log.info("Starting S1_IOC_manager v1")
     app = ViewerAppWindow()
     app.mainloop()
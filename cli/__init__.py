@@ -0,0 +1 @@
+from .cli_app import main
\ No newline at end of file
@@ -0,0 +1,214 @@
+import argparse, json, sys, threading
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config.config_loader import config
+from utils.log_handler import logger
+
+from data import sync_s1_ioc, count_db_ioc, get_db_ioc_window, delete_s1_iocs, get_db_ioc_values_by_filter, export_iocs, get_api_metrics
+from data.S1_IOC_interactor import upload_iocs_to_s1
+from data.ioc_importer import scan_iocs, get_retention_days, FILE_FORMATS, IOC_TYPES
+from data.ioc_exporter import EXPORT_FORMATS, EXPORT_COLUMNS
+from data.db_handler import FILTER_COLUMNS
+
+log = logger.get_logger(__name__)
+
+FILTER_TYPES = list(FILTER_COLUMNS)
+WINDOW_SIZE = 5000  # Rows read from the local DB at a time by search
+
+class Progress:
+    # Single line progress counter on stderr, safe to update from the worker threads
+    def __init__(self, label, total):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.lock = threading.Lock()
+
+    def update(self, step=1):
+        with self.lock:
+            self.done += step
+            print(f"\r{self.label}: {self.done}/{self.total}", end="", file=sys.stderr, flush=True)
+            if self.done >= self.total:
+                print(file=sys.stderr)
+
+def _iter_db_rows(search_value, filter_type, limit=None):
+    # Reads the matching rows one window at a time, memory stays flat whatever the number of IOCs
+    total = count_db_ioc(search_value, filter_type)
+    if limit is not None:
+        total = min(total, limit)
+
+    for offset in range(0, total, WINDOW_SIZE):
+        for row in get_db_ioc_window(offset, min(WINDOW_SIZE, total - offset), search_value, filter_type):
+            yield dict(row)
+
+def _sync(full_sync=False):
+    print("Syncing the local DB with SentinelOne...", file=sys.stderr)
+    if not sync_s1_ioc(full_sync=full_sync):
+        print("Sync failed, using the IOCs already in the local DB.", file=sys.stderr)
+        return False
+    return True
+
+def cmd_sync(args):
+    return 0 if _sync(args.full) else 1
+
+def cmd_search(args):
+    if args.sync:
+        _sync()
+
+    rows = _iter_db_rows(args.value, args.filter_type, args.limit)
+    count = 0
+    for row in rows:
+        count += 1
+        if args.json:
+            print(json.dumps(row))
+        else:
+            print(f"{row['type']:<7} {row['value']:<50} {row['name'] or ''} [{row['source'] or ''}]")
+
+    print(f"{count} IOCs found.", file=sys.stderr)
+    return 0
+
+def cmd_export(args):
+    if args.sync:
+        _sync()
+
+    columns = args.columns.split(",") if args.columns else None
+    written = export_iocs(args.output, args.format, columns, True if args.gzip else None, args.search, args.filter_type,
+                          on_progress=lambda done: print(f"\rExported: {done}", end="", file=sys.stderr, flush=True))
+    print(f"\n{written} IOCs exported to {args.output}.", file=sys.stderr)
+    return 0
+
+def cmd_upload(args):
+    # The local DB tells which IOCs are already on the console, the file is streamed against it
+    if not args.no_sync:
+        _sync()
+
+    scan = scan_iocs(args.file, args.format, args.type)
+    for value, reason in scan["rejects"]:
+        print(f"Skipping [{value}]: {reason}.", file=sys.stderr)
+    if scan["rejected"] > len(scan["rejects"]):
+        print(f"... and {scan['rejected'] - len(scan['rejects'])} more invalid values.", file=sys.stderr)
+
+    if len(scan["new"]) + len(scan["existing"]) == 0:
+        print("No IOC to upload.", file=sys.stderr)
+        return 1 if scan["rejected"] else 0
+
+    iocs = scan["new"] + (scan["existing"] if args.update_existing else [])
+    pending = [(value, ioc_type, get_retention_days(ioc_type)) for value, ioc_type in iocs]
+    print(f"{len(pending)} IOCs to upload, {len(scan['existing'])} already on SentinelOne{'' if args.update_existing else ' skipped'}.", file=sys.stderr)
+    if len(pending) == 0 or args.dry_run:
+        for value, ioc_type, _ in pending:
+            print(f"{ioc_type:<7} {value}")
+        return 0
+
+    # Every worker uploads its own chunks, each chunk is a single POST
+    chunk_size = args.chunk_size or config.get("upload_chunk_size", 500)
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    progress = Progress("Uploaded", len(pending))
+    results = []
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(upload_iocs_to_s1, chunk, args.name, args.description, chunk_size) for chunk in chunks]
+        for future in as_completed(futures):
+            chunk_results = future.result()
+            results.extend(chunk_results)
+            progress.update(len(chunk_results))
+
+    failed = [result for result in results if not result["uploaded"]]
+    for result in failed:
+        print(f"Not uploaded: {result['type']} [{result['value']}] {result['error']}", file=sys.stderr)
+    print(f"{len(results) - len(failed)} of {len(results)} IOCs uploaded.", file=sys.stderr)
+    return 1 if failed else 0
+
+def cmd_delete(args):
+    if args.search is None and args.source is None and args.older_than is None:
+        print("Give at least one of --search, --source or --older-than.", file=sys.stderr)
+        return 2
+    if args.sync:
+        _sync()
+
+    values = get_db_ioc_values_by_filter(args.search, args.filter_type, args.source, args.older_than)
+    if len(values) == 0:
+        print("No IOC matches the filter.", file=sys.stderr)
+        return 0
+
+    if not args.yes:
+        for value in values:
+            print(value)
+        print(f"{len(values)} IOCs match the filter. Run again with --yes to delete them.", file=sys.stderr)
+        return 0
+
+    progress = Progress("Deleted", len(values))
+    results = delete_s1_iocs(values, args.workers, on_progress=lambda done, total: progress.update())
+
+    failed = [result["value"] for result in results if not result["deleted"]]
+    for value in failed:
+        print(f"Not deleted: [{value}]", file=sys.stderr)
+    print(f"{len(values) - len(failed)} of {len(values)} IOCs deleted, {sum(result['affected'] for result in results)} removed from SentinelOne.", file=sys.stderr)
+    return 1 if failed else 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="S1_IOC_manager.py", description="Manage SentinelOne IOCs without the GUI. Run without arguments to open the GUI.")
+    parser.add_argument("--metrics", action="store_true", help="Print the S1 API call metrics (rate limiter, concurrency) to stderr at the end")
+    commands = parser.add_subparsers(dest="command", required=True)
+    workers = config.get("cli_workers", 4)
+
+    sync = commands.add_parser("sync", help="Download the IOCs changed since the last sync into the local DB")
+    sync.add_argument("--full", action="store_true", help="Download every IOC, not only the changed ones, and drop the ones deleted on SentinelOne")
+    sync.set_defaults(handler=cmd_sync)
+
+    search = commands.add_parser("search", help="Search the local DB")
+    search.add_argument("value", help="Text to look for")
+    search.add_argument("--filter-type", choices=FILTER_TYPES, default="Value")
+    search.add_argument("--limit", type=int, default=None)
+    search.add_argument("--json", action="store_true", help="Print one JSON object per line")
+    search.add_argument("--sync", action="store_true", help="Sync with SentinelOne first")
+    search.set_defaults(handler=cmd_search)
+
+    export = commands.add_parser("export", help="Export the local DB to CSV, JSON lines or Parquet")
+    export.add_argument("--output", "-o", default="./IOC_Manager_export.csv", help="Output file, the format is guessed from the extension (.csv, .jsonl, .parquet, optionally .gz)")
+    export.add_argument("--format", choices=EXPORT_FORMATS, default=None)
+    export.add_argument("--columns", default=None, help=f"Comma separated list of columns, among: {','.join(EXPORT_COLUMNS)}")
+    export.add_argument("--gzip", action="store_true", help="Compress the output")
+    export.add_argument("--search", default=None, help="Export only the IOCs matching this text")
+    export.add_argument("--filter-type", choices=FILTER_TYPES, default="Value")
+    export.add_argument("--sync", action="store_true", help="Sync with SentinelOne first")
+    export.set_defaults(handler=cmd_export)
+
+    upload = commands.add_parser("upload", help="Upload the IOCs of a TXT, CSV, JSON, JSONL, STIX or MISP file")
+    upload.add_argument("file")
+    upload.add_argument("--name", required=True, help="Name given to the uploaded IOCs")
+    upload.add_argument("--description", required=True, help="Description given to the uploaded IOCs")
+    upload.add_argument("--format", choices=FILE_FORMATS, default=None, help="File format, guessed from the extension by default")
+    upload.add_argument("--type", choices=IOC_TYPES, default=None, help="Type of the values without one, detected from the value by default")
+    upload.add_argument("--update-existing", action="store_true", help="Upload again the IOCs already on SentinelOne")
+    upload.add_argument("--no-sync", action="store_true", help="Check the existing IOCs against the local DB without syncing it")
+    upload.add_argument("--dry-run", action="store_true", help="Only print the IOCs that would be uploaded")
+    upload.add_argument("--chunk-size", type=int, default=None)
+    upload.add_argument("--workers", type=int, default=workers)
+    upload.set_defaults(handler=cmd_upload)
+
+    delete = commands.add_parser("delete", help="Delete from SentinelOne the IOCs matching a filter")
+    delete.add_argument("--search", default=None, help="Delete the IOCs matching this text")
+    delete.add_argument("--filter-type", choices=FILTER_TYPES, default="Value")
+    delete.add_argument("--source", default=None, help="Delete only the IOCs of this source")
+    delete.add_argument("--older-than", type=int, default=None, metavar="DAYS", help="Delete only the IOCs created more than DAYS days ago")
+    delete.add_argument("--sync", action="store_true", help="Sync with SentinelOne first")
+    delete.add_argument("--yes", action="store_true", help="Delete without asking, otherwise only the matching IOCs are printed")
+    delete.add_argument("--workers", type=int, default=None, help="Parallel DELETE requests, delete_workers of config.yml by default")
+    delete.set_defaults(handler=cmd_delete)
+
+    return parser
+
+def main(argv=None):
+    # stdout is kept for the command output, so it can be piped
+    logger.console = sys.stderr
+    args = build_parser().parse_args(argv)
+    log.info("Running the [%s] command.", args.command)
+    try:
+        return args.handler(args)
+    except KeyboardInterrupt:
+        print("\nInterrupted.", file=sys.stderr)
+        return 130
+    finally:
+        if args.metrics:
+            print(json.dumps(get_api_metrics(), indent=2), file=sys.stderr)
@@ -1,22 +1,40 @@
-import yaml
 from pathlib import Path
 
 class Config:
     def __init__(self, path="config/config.yml"):
-        self._data = self._load_config(path)
+        # config.yml is read by the first lookup, not at import time
+        self._path = path
+        self._data = None
+        self._loaded = False
 
     def _load_config(self, path):
+        # PyYAML is only imported when the file is actually read
+        import yaml
+
         config_path = Path(path)
         if not config_path.exists():
             raise FileNotFoundError(f"Config file not found here: {config_path}, maybe you need to rename the config.example.yml to config.yml?")
         with config_path.open() as f:
             return yaml.safe_load(f)
 
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._data = self._load_config(self._path)
+            self._loaded = True
+
+    def get(self, name, default=None):
+        # Optional settings: fall back to a default when the key is not in config.yml
+        self._ensure_loaded()
+        return self._data.get(name, default) if self._data else default
+
     def __getattr__(self, name):
         # Allow attribute-style access: config.api_token
+        if name.startswith("_"):
+            raise AttributeError(name)
+        self._ensure_loaded()
         try:
             return self._data[name]
-        except KeyError:
+        except (KeyError, TypeError):
             raise AttributeError(f"Config has no attribute '{name}'. Check again the config.example.yml to have an idea on how to structure it.")
 
 config = Config()
\ No newline at end of file
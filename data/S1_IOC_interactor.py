@@ -1,154 +1,187 @@
-import requests, traceback
+import traceback, time, json, threading
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 from config.config_loader import config
 from utils.log_handler import logger
 from .db_handler import IOC_DB
+from .s1_client import s1_client
+from .rate_limiter import rate_limiter
+from .ioc_detail_cache import detail_cache
 
+log = logger.get_logger(__name__)
 
-def __get_s1_ioc():
+PAGE_SIZE = 1000
 
-    # This function is used to refresh the DB. Emptying it before starting
+# Only one sync runs at a time: the viewer, the uploader and the CLI share the DB and its watermark
+SYNC_LOCK = threading.Lock()
 
-    IOC_DB.delete_all()
+def __iter_s1_ioc_pages(params):
+    # Generator yielding the IOC list one page at a time, following the pagination cursor.
+    # Only one page is kept in memory. Raises requests.HTTPError on a non 200 answer.
+    import requests  # Loaded with the first download, not at startup
 
-    # Preparing the headers for the GET request
-    headers = {'Authorization': f'ApiToken {config.s1_token}'}   
-    logger.print_log("[INFO] Sending the get request to SentinelOne.")
+    page_params = {**params, "limit": PAGE_SIZE}
 
-    ioc_list = []
-    try:
-        params = {
-            "limit": 1000,
-            "creationTime__gt": (datetime.now() - timedelta(hours=24)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
-        }
-        res = requests.get(f"{config.s1_api}threat-intelligence/iocs?limit=1000", headers=headers, params=params)
-        res_data = []
+    page_number = 1
+    while True:
+        res = s1_client.get("threat-intelligence/iocs", params=page_params)
 
-        i = 1
-        while True:
-            data = res.json()
-            res_data.extend(data.get("data", []))  
-            next_cursor = data.get("pagination", {}).get("nextCursor")
+        if res.status_code != 200:
+            raise requests.HTTPError(f"Received status code [{res.status_code}] for page number {page_number}.", response=res)
 
-            if not next_cursor:
-                break
+        data = res.json()
+        yield data.get("data", [])
 
-            logger.print_log(f"[INFO] More than 1000 IOCs received. Asking for next page. Page number: {i}.")
-            
-            res = requests.get(f"{config.s1_api}threat-intelligence/iocs?limit=1000", headers=headers, params={"cursor": next_cursor})
+        next_cursor = data.get("pagination", {}).get("nextCursor")
+        if not next_cursor:
+            return
 
-    except Exception:
-        print(traceback.format_exc())  
+        page_number += 1
+        log.debug("More than %s IOCs received. Asking for next page. Page number: %s.", PAGE_SIZE, page_number)
 
-    if res.status_code == 200:
-        logger.print_log(f"[SUCCESS] Status code [200] received. {len(res_data)} IOCs found.")
-
-        if(len(res_data) > 0):
-            logger.print_log("[INFO] At least one IOC found. Populating the database with the IOCs.")
-            try:
-                for ioc in res_data:
-                    IOC_DB.insert_ioc(name = ioc['name'], 
-                                    description = ioc['description'], 
-                                    ioc_type = ioc['type'],
-                                    value = ioc['value'],
-                                    metadata = ioc['metadata'],
-                                    source =  ioc['source'],
-                                    creationTime = ioc['creationTime'],
-                                    updatedAt = ioc['updatedAt'],
-                                    validUntil = ioc['validUntil']
-                    )
-            except:
-                logger.print_log(f"[ERROR] Exception while trying to populate the DB.")
-            
-            logger.print_log("[INFO] Database correctly populted. Exporting and converting it to a python dictionary.")
-
-            return [dict(ioc) for ioc in IOC_DB.fetch_all()]
-        else:
-            logger.print_log("[WARNING] No IOC was found. Returning an empty IOC to allow table generation.")
+        # The filters must be sent again with the cursor, otherwise the next pages are unfiltered
+        page_params = {**params, "limit": PAGE_SIZE, "cursor": next_cursor}
+
+def __sync_s1_ioc(full_sync=False, on_page=None, cancel_event=None):
+    # A sync asked while another one runs waits for it, then only downloads what changed in between
+    if not SYNC_LOCK.acquire(blocking=False):
+        log.info("A sync is already running. Waiting for it to end.")
+        SYNC_LOCK.acquire()
+    try:
+        if cancel_event is not None and cancel_event.is_set():
+            log.warning("Sync cancelled before it started.")
+            return False
+        return __run_sync(full_sync, on_page, cancel_event)
+    finally:
+        SYNC_LOCK.release()
+
+def __run_sync(full_sync, on_page, cancel_event):
+
+    # This function is used to refresh the DB. Only the IOCs updated after the last
+    # sync watermark are requested, unless a full sync is asked or the DB is empty.
+    # Every page is written to the DB as soon as it arrives, then on_page (if any) is
+    # called with the number of IOCs stored from that page, so the caller can reload its view.
+    # Setting cancel_event stops the sync between two pages, the watermark is left untouched.
+    # A full download upserts over the cached IOCs: only once every page is stored, the IOCs it did
+    # not return (deleted on the console) are pruned. A failed or cancelled one keeps the whole cache.
+    import requests
+
+    started_at = int(time.time())
+    previous_watermark = IOC_DB.get_watermark()
+    watermark = None if full_sync else previous_watermark
+    log.info("Sending the get request to SentinelOne.")
+
+    params = {}
+    bulk_load = False
+    if watermark:
+        log.info("Incremental sync. Asking only for IOCs updated after [%s].", watermark)
+        params["updatedAt__gt"] = watermark
     else:
-        logger.print_log(f"[ERROR] Error while trying to donwload the IOC list. Received status code [{res.status_code}].")    
+        log.info("%s Downloading the full IOC list.", "Full sync asked." if full_sync else "No sync watermark found.")
+        # Building the indexes once at the end is only worth it when the DB is empty
+        bulk_load = IOC_DB.count_filtered() == 0
+        if bulk_load:
+            IOC_DB.suspend_indexes()
+        else:
+            # fetchedAt has a one second resolution: start on a new second, so that no IOC stored
+            # before this download shares its start time and escapes the pruning
+            time.sleep(1 - time.time() % 1)
+            started_at = int(time.time())
 
-    logger.print_log("[WARNING] Something went wrong. Creating an empty IOC to allow table generation.")
-    
-    ioc = {
-                        'num': 1,
-                        'name': f"No IOC found",
-                        'description': "",
-                        'type': "",
-                        'value': "",
-                        'metadata': "",                
-                        'source': "",                
-                        'creationTime': "",
-                        'updatedAt': "",
-                        'validUntil': ""
-                    }
-                    
-    ioc_list.append(ioc)
-
-    return ioc_list
-
-def __get_db_ioc_by_filter(value=None, filter_type="Value"):
-    logger.print_log(f"[INFO] Sending the get request to the internal DB filtered for [{value}], filter type set to [{filter_type}].")
-    ioc_list = []
+    total = 0
+    new_watermark = watermark
     try:
-        ioc_list = IOC_DB.fetch_filtered(value, filter_type)
+        for page in __iter_s1_ioc_pages(params):
+            if cancel_event is not None and cancel_event.is_set():
+                log.warning("Sync cancelled after %s IOCs. The next sync will download the missing ones.", total)
+                return False
+
+            stored, rejects = IOC_DB.insert_many(page)
+            total += stored
+            detail_cache.discard(ioc['value'] for ioc in page if isinstance(ioc, dict) and 'value' in ioc)
+
+            for ioc, reason in rejects:
+                log.error("IOC [%s] rejected by the database: %s", ioc.get('value') if isinstance(ioc, dict) else ioc, reason)
+
+            # ISO timestamps in the same format sort lexicographically
+            updated = [ioc['updatedAt'] for ioc in page if isinstance(ioc, dict) and ioc.get('updatedAt')]
+            if updated and (not new_watermark or max(updated) > new_watermark):
+                new_watermark = max(updated)
+
+            if on_page is not None and stored > 0:
+                on_page(stored)
+    except requests.HTTPError as e:
+        log.error("Error while trying to donwload the IOC list. %s Keeping the cached IOCs.", e)
+        return False
+    except Exception:
+        log.error("Exception while trying to donwload the IOC list. Keeping the cached IOCs.\n%s", traceback.format_exc())
+        return False
+    finally:
+        if bulk_load:
+            IOC_DB.restore_indexes()
 
-        logger.print_log(f"[SUCCESS] IOC retrieved from the database. {len(ioc_list)} IOCs Found")
+    log.success("IOC list downloaded. %s new or updated IOCs stored in the database.", total)
 
-        if (len(ioc_list) > 0):
-            return [dict(ioc) for ioc in ioc_list]
-        else:
-            logger.print_log(f"[WARNING] Zero IOC retrieved. Creating an empty IOC to allow table generation.")
-    except:
-        logger.print_log(f"[ERROR] Error while trying to get the IOC from the internal DB filtered for [{value}]. Creating an empty IOC to allow table generation.")
-
-    ioc = {
-        'num': 1,
-        'name': f"No IOC found",
-        'description': "",
-        'type': "",
-        'value': "",
-        'metadata': "",                
-        'source': "",                
-        'creationTime': "",
-        'updatedAt': "",
-        'validUntil': ""
-    }
-                    
-    ioc_list.append(ioc)
-    return ioc_list    
+    # The watermark only moves once every page is stored, so an interrupted sync is retried in full
+    if new_watermark != previous_watermark:
+        IOC_DB.set_watermark(new_watermark)
+    IOC_DB.set_last_sync(started_at)
+
+    if not watermark:
+        stale = IOC_DB.delete_not_fetched_since(started_at)
+        if stale > 0:
+            detail_cache.clear()
+            log.info("%s IOCs no longer on SentinelOne removed from the database.", stale)
+
+    pruned = IOC_DB.delete_expired(int(time.time()))
+    if pruned > 0:
+        log.info("%s expired IOCs removed from the database.", pruned)
+
+    return True
+
+def __count_db_ioc(value=None, filter_type=None):
+    return IOC_DB.count_filtered(value, filter_type)
+
+def __get_db_ioc_window(offset, limit, value=None, filter_type=None, order_by="num", descending=False):
+    # Returns only one window of the cached IOCs, the virtual table never loads the full list
+    return [dict(ioc) for ioc in IOC_DB.fetch_window(offset, limit, value, filter_type, order_by, descending)]
+
+def __get_db_ioc_by_values(values):
+    # Bulk presence check against the local store: {lowercase value: IOC}
+    log.info("Looking for %s values in the internal DB.", len(values))
+    found = {ioc['value'].lower(): dict(ioc) for ioc in IOC_DB.fetch_by_values(values)}
+    log.info("%s of %s values already present in the internal DB.", len(found), len(values))
+    return found
 
 def __get_s1_ioc_by_value(value):
-    headers = {'Authorization': f'ApiToken {config.s1_token}'}   
-    logger.print_log(f"[INFO] Sending the get request for value [{value}] to SentinelOne.")
+    log.info("Sending the get request for value [%s] to SentinelOne.", value)
 
     try:
-        res = requests.get(f"{config.s1_api}threat-intelligence/iocs?value={value}", headers=headers)
+        res = s1_client.get("threat-intelligence/iocs", budget="lookup", params={"value": value})
     except:
-        logger.print_log(f"[ERROR] Exception while trying to donwload the IOC list.")    
+        log.error("Exception while trying to donwload the IOC list. Returning None.")
+        return None
 
     if res.status_code == 200:
         res_data = (res.json())["data"]
-        logger.print_log(f"[SUCCESS] Status code [200] received for IOC [{value}].")
+        log.success("Status code [200] received for IOC [%s].", value)
 
         if(len(res_data) == 1):
             return res_data[0]
         elif(len(res_data) > 1):
-            logger.print_log(f"[WARNING] Found multiple entry for value [{value}]. Received [{len(res_data)}] IOCs. Returning only the first one.")
+            log.warning("Found multiple entry for value [%s]. Received [%s] IOCs. Returning only the first one.", value, len(res_data))
             return res_data[0]
         else:
-            logger.print_log(f"[INFO] IOC [{value}] Not found. Returning None.")
+            log.info("IOC [%s] Not found. Returning None.", value)
             return None
     else:
-        logger.print_log(f"[ERROR] Error while trying to donwload the IOC list. Received status code [{res.status_code}]. Returning None.")    
+        log.error("Error while trying to donwload the IOC list. Received status code [%s]. Returning None.", res.status_code)
         return None
 
-def __delete_s1_ioc_by_value(value):
-    headers = {'Authorization': f'ApiToken {config.s1_token}'}   
-    logger.print_log(f"[INFO] Sending the delete request for value [{value}] to SentinelOne.")
-
+def __send_s1_delete(value):
+    # One DELETE request filtered by value. Returns the number of IOCs S1 reports as affected, None on failure
     body = {
         "filter": {
             "value": f"{value}"
@@ -156,71 +189,219 @@ def __delete_s1_ioc_by_value(value):
     }
     
     try:
-        res = requests.delete(f"{config.s1_api}threat-intelligence/iocs", headers=headers, json=body)
+        res = s1_client.delete("threat-intelligence/iocs", json=body)
     except:
-        logger.print_log(f"[ERROR] Exception while trying to delete the IOC with value [{value}].")   
-        return False
+        log.error("Exception while trying to delete the IOC with value [%s].", value)
+        return None
          
     if res.status_code == 200:
-        logger.print_log(f"[SUCCESS] Status code [200] received for deleteing IOC [{value}].")
+        log.success("Status code [200] received for deleteing IOC [%s].", value)
         res_data = (res.json())["data"]
-        logger.print_log(f"[INFO] IOC [{value}] has been deleted. Number of affected element: {[{res_data['affected']}]}.")
-
-        return True
+        log.info("IOC [%s] has been deleted. Number of affected element: [%s].", value, res_data['affected'])
+        return res_data['affected']
 
     else:
-        logger.print_log(f"[ERROR] Error while trying to delete the IOC [{value}]. Received status code [{res.status_code}].")    
+        log.error("Error while trying to delete the IOC [%s]. Received status code [%s].", value, res.status_code)
+        return None
+
+def __get_ioc_detail(value):
+    # Full payload of an IOC without calling S1. Returns (ioc, fresh):
+    # ioc is None when the IOC is not cached, fresh is False when the cached copy is older than
+    # the detail cache TTL, in which case the caller should refresh it with refresh_ioc_detail.
+    ioc = detail_cache.get(value)
+    if ioc is not None:
+        return ioc, True
+
+    row = IOC_DB.fetch_detail(value)
+    if row is None or row["raw"] is None:
+        return None, False
+
+    # A row is as recent as the last sync that could have changed it
+    ioc = json.loads(row["raw"])
+    checked_at = max(row["fetchedAt"] or 0, IOC_DB.get_last_sync() or 0)
+    fresh = detail_cache.is_fresh(checked_at)
+    if fresh:
+        detail_cache.put(value, ioc, checked_at)
+    return ioc, fresh
+
+def __refresh_ioc_detail(value):
+    # Asks S1 for the current payload and stores it. Returns None if the IOC no longer exists.
+    ioc = __get_s1_ioc_by_value(value)
+    if ioc is None:
+        detail_cache.discard([value])
+        return None
+
+    IOC_DB.insert_many([ioc])
+    detail_cache.put(value, ioc)
+    return ioc
+
+def __delete_s1_ioc_by_value(value):
+    log.info("Sending the delete request for value [%s] to SentinelOne.", value)
+
+    if __send_s1_delete(value) is None:
         return False
 
-def __post_s1_upload_ioc(ioc_value, ioc_type, retention_days, name, description):
-    headers = {'Authorization': f'ApiToken {config.s1_token}'}
-    logger.print_log("[INFO] Sending POST request to the SentinelOne API.")
+    # The delta sync never reports deletions, so the local copy is removed here
+    IOC_DB.delete_by_value(value)
+    detail_cache.discard([value])
+    return True
+
+def __get_db_ioc_values_by_filter(value=None, filter_type=None, source=None, older_than_days=None):
+    # Values of the cached IOCs matching the filter. older_than_days looks at the creation time.
+    created_before = None
+    if older_than_days is not None:
+        created_before = int(time.time()) - older_than_days * 86400
+
+    values = IOC_DB.fetch_values_by_filter(value, filter_type, source, created_before)
+    log.info("%s IOCs match the delete filter (value [%s] on [%s], source [%s], older than [%s] days).", len(values), value, filter_type, source, older_than_days)
+    return values
+
+def __delete_s1_iocs(values, workers=None, on_progress=None, cancel_event=None):
+    # Deletes many IOCs running up to workers DELETE requests at the same time.
+    # Returns one result per value: {"value", "deleted", "affected"}
+    # on_progress(done, total) is called after every request, cancel_event stops the requests not yet started.
+    # The local DB is updated once at the end, with the values S1 accepted to delete.
+    workers = workers or config.get("delete_workers", 8)
+    log.info("Deleting %s IOCs from SentinelOne with %s parallel requests.", len(values), workers)
+
+    def delete(value):
+        if cancel_event is not None and cancel_event.is_set():
+            return {"value": value, "deleted": False, "affected": 0}
+        affected = __send_s1_delete(value)
+        return {"value": value, "deleted": affected is not None, "affected": affected or 0}
+
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(delete, values):
+            results.append(result)
+            if on_progress is not None:
+                on_progress(len(results), len(values))
+
+    # An IOC S1 no longer knows about (affected 0) is gone from the console as well
+    deleted = [result["value"] for result in results if result["deleted"]]
+    IOC_DB.delete_by_values(deleted)
+    detail_cache.discard(deleted)
+
+    affected = sum(result["affected"] for result in results)
+    log.info("Bulk delete completed. %s of %s requests succeeded, %s IOCs removed from SentinelOne.", len(deleted), len(values), affected)
+    return results
+
+def __build_s1_ioc_item(ioc_value, ioc_type, retention_days, name, description):
+    return {
+        "value": ioc_value,
+        "type": ioc_type,
+        "metadata": config.creator_mail,
+        "creator": config.creator_mail,
+        "originalRiskScore": "100",
+        "validUntil": str(datetime.now() + timedelta(days=retention_days)),
+        "method": "EQUALS",
+        "name": f"{config.ioc_tag} {name}",
+        "description": f"{config.ioc_tag} {description}",
+        "source": "Manual Upload",
+        "creationTime": str(datetime.now())
+    }
 
-    s1_ti_body = {
+def __build_s1_upload_body(items):
+    return {
         "filter": {
             "tenant": "False",
             "accountIds": [
                 f"{config.s1_account_id}"
             ]
 	    },
-        "data": [
-            {
-            "value": ioc_value,
-            "type": ioc_type,
-            "metadata": config.creator_mail,
-            "creator": config.creator_mail,
-            "originalRiskScore": "100",
-            "validUntil": str(datetime.now() + timedelta(days=retention_days)),
-            "method": "EQUALS",
-            "name": f"{config.ioc_tag} {name}",
-            "description": f"{config.ioc_tag} {description}",
-            "source": "Manual Upload",
-            "creationTime": str(datetime.now())
-            }
-        ]
+        "data": items
     }
 
-    try:        
-        res = requests.post(f"{config.s1_api}threat-intelligence/iocs", headers=headers, json=s1_ti_body)
+def __post_s1_upload_chunk(chunk, name, description):
+    # Sends one POST for a list of (ioc_value, ioc_type, retention_days) and returns one result per IOC
+    body = __build_s1_upload_body([__build_s1_ioc_item(value, ioc_type, retention_days, name, description) for value, ioc_type, retention_days in chunk])
 
-        if res.status_code == 200:
-            return res
-        else:
-            return res
-    except:
-        return None
+    try:
+        res = s1_client.post("threat-intelligence/iocs", json=body)
+    except Exception as e:
+        log.error("Exception while uploading a chunk of %s IOCs: %s", len(chunk), e)
+        return [{"value": value, "type": ioc_type, "uploaded": False, "status_code": None, "error": str(e)} for value, ioc_type, _ in chunk]
 
-def get_s1_ioc():
-    return __get_s1_ioc()
+    if res.status_code != 200:
+        log.error("Chunk of %s IOCs not uploaded. Received status code [%s].", len(chunk), res.status_code)
+        return [{"value": value, "type": ioc_type, "uploaded": False, "status_code": res.status_code, "error": f"Status code {res.status_code}"} for value, ioc_type, _ in chunk]
 
-def get_s1_filtered_ioc(value, filter_type):
-    return __get_db_ioc_by_filter(value, filter_type)
+    # S1 answers with the created IOCs. An IOC missing from the answer has not been accepted.
+    # A missing, empty or unreadable data list confirms nothing, so the whole chunk counts as failed.
+    try:
+        data = res.json().get("data")
+        accepted = {(ioc.get("value") or "").lower() for ioc in data if isinstance(ioc, dict)} if isinstance(data, list) else set()
+    except (ValueError, AttributeError):
+        accepted = set()
+
+    if not accepted:
+        log.error("Chunk of %s IOCs not confirmed. SentinelOne answered [200] without the created IOCs.", len(chunk))
+        return [{"value": value, "type": ioc_type, "uploaded": False, "status_code": res.status_code, "error": "Upload not confirmed by SentinelOne"} for value, ioc_type, _ in chunk]
+
+    results = []
+    for value, ioc_type, _ in chunk:
+        uploaded = value.lower() in accepted
+        results.append({"value": value, "type": ioc_type, "uploaded": uploaded, "status_code": res.status_code,
+                        "error": None if uploaded else "Not returned by SentinelOne"})
+    return results
+
+def __post_s1_upload_iocs(iocs, name, description, chunk_size=None, on_progress=None, cancel_event=None):
+    # Uploads many IOCs of mixed types packing up to chunk_size of them in each POST.
+    # iocs is a list of (ioc_value, ioc_type, retention_days).
+    # Returns one result per IOC: {"value", "type", "uploaded", "status_code", "error"}
+    # on_progress(done, total) is called after every chunk, cancel_event stops before the next chunk.
+    chunk_size = chunk_size or config.get("upload_chunk_size", 500)
+    results = []
+
+    for i in range(0, len(iocs), chunk_size):
+        if cancel_event is not None and cancel_event.is_set():
+            log.warning("Upload cancelled. %s IOCs not sent.", len(iocs) - i)
+            results.extend({"value": value, "type": ioc_type, "uploaded": False, "status_code": None, "error": "Upload cancelled"} for value, ioc_type, _ in iocs[i:])
+            break
+
+        chunk = iocs[i:i + chunk_size]
+        log.debug("Sending POST request with %s IOCs to the SentinelOne API. Chunk %s of %s.", len(chunk), i // chunk_size + 1, (len(iocs) - 1) // chunk_size + 1)
+        results.extend(__post_s1_upload_chunk(chunk, name, description))
+
+        if on_progress is not None:
+            on_progress(len(results), len(iocs))
+
+    uploaded = sum(1 for result in results if result["uploaded"])
+    log.info("Bulk upload completed. %s of %s IOCs uploaded.", uploaded, len(iocs))
+    return results
+
+def sync_s1_ioc(full_sync=False, on_page=None, cancel_event=None):
+    return __sync_s1_ioc(full_sync, on_page, cancel_event)
+
+def count_db_ioc(value=None, filter_type=None):
+    return __count_db_ioc(value, filter_type)
+
+def get_db_ioc_window(offset, limit, value=None, filter_type=None, order_by="num", descending=False):
+    return __get_db_ioc_window(offset, limit, value, filter_type, order_by, descending)
+
+def get_db_ioc_by_values(values):
+    return __get_db_ioc_by_values(values)
 
 def get_s1_ioc_by_value(value):
     return __get_s1_ioc_by_value(value)
 
+def get_ioc_detail(value):
+    return __get_ioc_detail(value)
+
+def refresh_ioc_detail(value):
+    return __refresh_ioc_detail(value)
+
 def delete_s1_ioc_by_value(value):
     return __delete_s1_ioc_by_value(value)
 
-def upload_ioc_to_s1(ioc_value, ioc_type, retention_days, name, description):
-    return __post_s1_upload_ioc(ioc_value, ioc_type, retention_days, name, description)
\ No newline at end of file
+def get_db_ioc_values_by_filter(value=None, filter_type=None, source=None, older_than_days=None):
+    return __get_db_ioc_values_by_filter(value, filter_type, source, older_than_days)
+
+def delete_s1_iocs(values, workers=None, on_progress=None, cancel_event=None):
+    return __delete_s1_iocs(values, workers, on_progress, cancel_event)
+
+def upload_iocs_to_s1(iocs, name, description, chunk_size=None, on_progress=None, cancel_event=None):
+    return __post_s1_upload_iocs(iocs, name, description, chunk_size, on_progress, cancel_event)
+
+def get_api_metrics():
+    return rate_limiter.metrics()
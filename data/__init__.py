@@ -1,4 +1,11 @@
-from .S1_IOC_interactor import get_s1_ioc
-from .S1_IOC_interactor import get_s1_filtered_ioc
+from .S1_IOC_interactor import sync_s1_ioc
 from .S1_IOC_interactor import get_s1_ioc_by_value
-from .S1_IOC_interactor import delete_s1_ioc_by_value
\ No newline at end of file
+from .S1_IOC_interactor import get_ioc_detail
+from .S1_IOC_interactor import refresh_ioc_detail
+from .S1_IOC_interactor import delete_s1_ioc_by_value
+from .S1_IOC_interactor import delete_s1_iocs
+from .S1_IOC_interactor import get_db_ioc_values_by_filter
+from .S1_IOC_interactor import count_db_ioc
+from .S1_IOC_interactor import get_db_ioc_window
+from .S1_IOC_interactor import get_api_metrics
+from .ioc_exporter import export_iocs
\ No newline at end of file
@@ -1,60 +1,445 @@
-import sqlite3
+import sqlite3, threading, functools, re, json, time, pathlib
+from config.config_loader import config
 from utils.log_handler import logger
+from utils.time_handler import parse_s1_time
+
+log = logger.get_logger(__name__)
+
+# Bump this every time the schema changes. The DB is only a local cache of the
+# S1 console, so an outdated schema is simply dropped and rebuilt by a full sync.
+SCHEMA_VERSION = 9
+
+# Upsert by (value, type): a delta sync returns IOCs that may already be stored
+UPSERT_IOC_SQL = """
+    INSERT INTO iocs (name, description, type, value, metadata, source, creationTime, updatedAt, validUntil, raw, fetchedAt)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (value, type) DO UPDATE SET
+        name = excluded.name,
+        description = excluded.description,
+        metadata = excluded.metadata,
+        source = excluded.source,
+        creationTime = excluded.creationTime,
+        updatedAt = excluded.updatedAt,
+        validUntil = excluded.validUntil,
+        raw = excluded.raw,
+        fetchedAt = excluded.fetchedAt
+"""
+
+# Fields of the raw payload exposed as generated columns, so they can be indexed and filtered locally
+PAYLOAD_COLUMNS = {
+    "riskScore": "INTEGER GENERATED ALWAYS AS (CAST(json_extract(raw, '$.originalRiskScore') AS INTEGER)) VIRTUAL",
+    "method": "TEXT COLLATE NOCASE GENERATED ALWAYS AS (json_extract(raw, '$.method')) VIRTUAL",
+    "creator": "TEXT COLLATE NOCASE GENERATED ALWAYS AS (json_extract(raw, '$.creator')) VIRTUAL",
+    "accountId": "TEXT COLLATE NOCASE GENERATED ALWAYS AS (json_extract(raw, '$.accountId')) VIRTUAL"
+}
+
+# Search filters offered by the GUI and the column they apply to
+FILTER_COLUMNS = {
+    "Value": "value",
+    "Name": "name",
+    "Description": "description",
+    "User": "metadata",
+    "Source": "source",
+    "Creator": "creator",
+    "Method": "method",
+    "Account ID": "accountId",
+    "Risk score": "riskScore"
+}
+
+# Risk score searches: ">= 80", "<50", "=100" or just "80" (same as ">= 80")
+RISK_SCORE_PATTERN = re.compile(r"^\s*(>=|<=|>|<|=)?\s*(\d+)\s*$")
+
+# Columns the IOC list can be ordered by
+SORT_COLUMNS = ("num", "name", "description", "type", "value", "metadata", "source", "creationTime", "updatedAt", "validUntil")
+
+# Columns with a secondary index, kept up to date by every write: the prefix searches of the filters
+# (value is covered by UNIQUE (value, type), name and description by FTS5) and the expiry pruning.
+# Every index slows the sync down, the other sortable columns get theirs the first time the list is sorted by them.
+INDEXED_COLUMNS = ("metadata", "source", "validUntil") + tuple(PAYLOAD_COLUMNS)
+
+# Compact JSON of the raw payloads, the encoder is built once instead of on every json.dumps call
+encode_raw = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+# Columns returned by the list queries. The raw payload is only read by fetch_detail.
+LIST_COLUMNS_SQL = ", ".join(f"iocs.{column}" for column in SORT_COLUMNS)
+
+def escape_like(search_value):
+    # Escapes the LIKE wildcard _ (and the escape character itself), % is left to the caller
+    return search_value.replace("\\", "\\\\").replace("_", "\\_")
+
+def synchronized(method):
+    # The connection is shared between the Tk thread and the background workers.
+    # It is opened by the first query, so importing this module does not touch the disk.
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            if self.conn is None:
+                self.open()
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class IOCDB:
-    def __init__(self):
-        self.conn = sqlite3.connect(":memory:")
-        self.conn.row_factory = sqlite3.Row 
-        self.cursor = self.conn.cursor()
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = None
+        self.cursor = None
+        self.sort_indexes = set()
 
+    def open(self):
+        with self.lock:
+            if self.conn is not None:
+                return
+            self.path = self.path or config.get("db_path", "./S1_IOC_manager.db")
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.row_factory = sqlite3.Row
+            self.cursor = self.conn.cursor()
+
+            # WAL keeps reads non-blocking while a sync is writing
+            self.cursor.execute("PRAGMA journal_mode=WAL")
+            self.cursor.execute("PRAGMA synchronous=NORMAL")
+            self.initialize_schema()
+
+    @synchronized
     def initialize_schema(self):
-        self.cursor.execute("""
-            CREATE TABLE iocs (
+        current_version = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+        if current_version not in (0, SCHEMA_VERSION):
+            log.warning("Local DB schema version [%s] differs from [%s]. Rebuilding the local DB.", current_version, SCHEMA_VERSION)
+            self._drop_schema()
+
+        self.cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS iocs (
                 num INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                description TEXT,                
-                type TEXT,
-                value TEXT,
-                metadata TEXT,
-                source TEXT,
-                creationTime DATE,
-                updatedAt DATE,
-                validUntil DATE
+                name TEXT COLLATE NOCASE,
+                description TEXT COLLATE NOCASE,
+                type TEXT COLLATE NOCASE,
+                value TEXT COLLATE NOCASE,
+                metadata TEXT COLLATE NOCASE,
+                source TEXT COLLATE NOCASE,
+                creationTime INTEGER,
+                updatedAt INTEGER,
+                validUntil INTEGER,
+                raw TEXT,
+                fetchedAt INTEGER,
+                {", ".join(f"{column} {definition}" for column, definition in PAYLOAD_COLUMNS.items())},
+                UNIQUE (value, type)
             )
         """)
+        self._create_indexes()
+
+        self._initialize_fts()
 
-    def insert_ioc(self, name, description, ioc_type, value, metadata, source, creationTime, updatedAt, validUntil):
         self.cursor.execute("""
-            INSERT INTO iocs (name, description, type, value, metadata, source, creationTime, updatedAt, validUntil)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (name, description, ioc_type, value, metadata, source, creationTime, updatedAt, validUntil))
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+        self.cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
 
-    def fetch_all(self):
-        self.cursor.execute("SELECT * FROM iocs")
-        return self.cursor.fetchall()
+    def _create_indexes(self):
+        # NOCASE indexes: equality and prefix LIKE searches are served by the index
+        for column in INDEXED_COLUMNS:
+            self.cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_iocs_{column} ON iocs ({column})")
+
+    def _ensure_sort_index(self, order_by):
+        # Built on the first sort by a column, so a sorted window is read straight from the index.
+        # It costs one pass over the table once, instead of slowing down every sync.
+        if order_by not in SORT_COLUMNS or order_by in ("num", "value") or order_by in INDEXED_COLUMNS or order_by in self.sort_indexes:
+            return
+        log.debug("Indexing the IOC list by [%s].", order_by)
+        self.cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_iocs_{order_by} ON iocs ({order_by})")
+        self.conn.commit()
+        self.sort_indexes.add(order_by)
+
+    @synchronized
+    def suspend_indexes(self):
+        # Building the indexes once after a full download is about twice as fast as updating them row by row.
+        # The sort indexes are dropped too, they come back with the next sort.
+        names = [row[0] for row in self.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name GLOB 'idx_iocs_*'")]
+        for name in names:
+            self.cursor.execute(f"DROP INDEX IF EXISTS {name}")
+        self.conn.commit()
+        self.sort_indexes.clear()
+
+    @synchronized
+    def restore_indexes(self):
+        self._create_indexes()
+        self.conn.commit()
+
+    def _initialize_fts(self):
+        # Full text index over name and description. Updates and deletes are mirrored by triggers,
+        # new rows are indexed set-based after each write (see _index_new_rows): a per-row insert
+        # trigger is several times slower than the insert itself on a bulk load.
+        # The sync upsert always rewrites name and description, so the update trigger only fires
+        # when one of them really changed.
+        # Some SQLite builds ship without FTS5: searches then fall back to LIKE.
+        try:
+            self.cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS iocs_fts USING fts5(
+                    name, description, content='iocs', content_rowid='num'
+                )
+            """)
+        except sqlite3.OperationalError:
+            log.warning("FTS5 is not available in this SQLite build. Name and description searches will be slower.")
+            self.fts_enabled = False
+            return
+
+        self.cursor.executescript("""
+            CREATE TRIGGER IF NOT EXISTS iocs_fts_delete AFTER DELETE ON iocs BEGIN
+                INSERT INTO iocs_fts (iocs_fts, rowid, name, description) VALUES ('delete', old.num, old.name, old.description);
+            END;
+            CREATE TRIGGER IF NOT EXISTS iocs_fts_update AFTER UPDATE OF name, description ON iocs
+            WHEN old.name IS NOT new.name OR old.description IS NOT new.description BEGIN
+                INSERT INTO iocs_fts (iocs_fts, rowid, name, description) VALUES ('delete', old.num, old.name, old.description);
+                INSERT INTO iocs_fts (rowid, name, description) VALUES (new.num, new.name, new.description);
+            END;
+        """)
+        self.fts_enabled = True
+
+    def _drop_schema(self):
+        self.cursor.execute("DROP TABLE IF EXISTS iocs_fts")
+        self.cursor.execute("DROP TABLE IF EXISTS iocs")
+        self.cursor.execute("DROP TABLE IF EXISTS sync_state")
+        self.sort_indexes.clear()
+
+    @staticmethod
+    def _ioc_to_row(ioc, fetched_at=None):
+        # Map an IOC as returned by the S1 API to the column order of UPSERT_IOC_SQL.
+        # Timestamps are parsed once here and stored as epoch seconds. The whole payload is kept
+        # as compact JSON, so the detail window does not need another API call.
+        # Only type and value (the upsert key) are required, the other fields are stored as NULL when missing.
+        return (ioc.get('name'), ioc.get('description'), ioc['type'], ioc['value'], ioc.get('metadata'), ioc.get('source'),
+                parse_s1_time(ioc.get('creationTime')), parse_s1_time(ioc.get('updatedAt')), parse_s1_time(ioc.get('validUntil')),
+                encode_raw(ioc), fetched_at or int(time.time()))
+
+    def _last_num(self):
+        return self.cursor.execute("SELECT COALESCE(MAX(num), 0) FROM iocs").fetchone()[0]
 
-    def fetch_filtered(self, search_value, filter_type):
-        
-        if(filter_type == "Value"):
-            self.cursor.execute("SELECT * FROM iocs WHERE value LIKE ?", (f"{search_value}",))
-        elif(filter_type =="Name"):
-            self.cursor.execute("SELECT * FROM iocs WHERE name LIKE ?", (f"{search_value}",))
-        elif(filter_type == "Description"):
-            self.cursor.execute("SELECT * FROM iocs WHERE description LIKE ?", (f"{search_value}",))
-        elif(filter_type == "User"):
-            self.cursor.execute("SELECT * FROM iocs WHERE metadata LIKE ?", (f"{search_value}",))
-        elif(filter_type == "Source"):
-            self.cursor.execute("SELECT * FROM iocs WHERE source LIKE ?", (f"{search_value}",))
+    def _index_new_rows(self, last_num):
+        # num is AUTOINCREMENT: every row inserted since last_num has a greater num
+        if self.fts_enabled:
+            self.cursor.execute("INSERT INTO iocs_fts (rowid, name, description) SELECT num, name, description FROM iocs WHERE num > ?", (last_num,))
 
+    def insert_many(self, iocs, chunk_size=None):
+        # Bulk upsert of IOCs (dicts as returned by the S1 API). Rows are sent with executemany,
+        # one transaction per chunk. A broken row does not drop its chunk: the chunk is replayed
+        # row by row and only the broken rows are reported back.
+        # Returns (number of stored rows, list of (ioc, reason) rejects).
+        chunk_size = chunk_size or config.get("db_chunk_size", 5000)
+        stored = 0
+        rejects = []
+        chunk = []
+        fetched_at = int(time.time())
+
+        for ioc in iocs:
+            try:
+                chunk.append((ioc, self._ioc_to_row(ioc, fetched_at)))
+            except (KeyError, TypeError) as e:
+                rejects.append((ioc, f"Missing or invalid field {e}"))
+                continue
+
+            if len(chunk) >= chunk_size:
+                stored += self._write_chunk(chunk, rejects)
+                chunk = []
+
+        if chunk:
+            stored += self._write_chunk(chunk, rejects)
+
+        return stored, rejects
+
+    @synchronized
+    def _write_chunk(self, chunk, rejects):
+        try:
+            with self.conn:
+                last_num = self._last_num()
+                self.cursor.executemany(UPSERT_IOC_SQL, [row for _, row in chunk])
+                self._index_new_rows(last_num)
+            return len(chunk)
+        except sqlite3.Error:
+            log.warning("Bulk insert of %s IOCs failed. Retrying them one by one to find the broken rows.", len(chunk))
+
+        stored = 0
+        with self.conn:
+            last_num = self._last_num()
+            for ioc, row in chunk:
+                try:
+                    self.cursor.execute(UPSERT_IOC_SQL, row)
+                    stored += 1
+                except sqlite3.Error as e:
+                    rejects.append((ioc, str(e)))
+            self._index_new_rows(last_num)
+        return stored
+
+    @synchronized
+    def fetch_by_values(self, values, chunk_size=500):
+        # Chunked IN lookups, SQLite limits the number of bound parameters per statement.
+        # value is declared NOCASE, so the lookup is case insensitive and served by the (value, type) index.
+        values = list(values)
+        rows = []
+        for i in range(0, len(values), chunk_size):
+            chunk = values[i:i + chunk_size]
+            self.cursor.execute(f"SELECT {LIST_COLUMNS_SQL} FROM iocs WHERE value IN ({','.join('?' * len(chunk))})", chunk)
+            rows.extend(self.cursor.fetchall())
+        return rows
+
+    def _filter_clause(self, search_value, filter_type):
+        # Returns the FROM/WHERE part of a filtered query and its parameters.
+        # Search modes:
+        # - no search value: every IOC
+        # - user wildcard (%): LIKE, a leading literal prefix is served by the NOCASE index.
+        #   _ is common in IOC names (APT_28), so it is always matched literally
+        # - Name / Description: FTS5 token search, every word matches as a prefix ("mal drop" -> mal* AND drop*)
+        # - Risk score: numeric comparison on the riskScore index
+        # - Value / User / Source / Creator / Method / Account ID: prefix search on the NOCASE index
+        if not search_value:
+            return "FROM iocs", ()
+
+        column = FILTER_COLUMNS.get(filter_type)
+        if column is None:
+            return "FROM iocs WHERE 0", ()
+
+        if column == "riskScore":
+            match = RISK_SCORE_PATTERN.match(search_value)
+            if match is None:
+                return "FROM iocs WHERE 0", ()
+            return f"FROM iocs WHERE riskScore {match.group(1) or '>='} ?", (int(match.group(2)),)
+        elif "%" in search_value:
+            return f"FROM iocs WHERE {column} LIKE ? ESCAPE '\\'", (escape_like(search_value),)
+        elif column in ("name", "description"):
+            tokens = re.findall(r"\w+", search_value)
+            if self.fts_enabled and tokens:
+                match = f"{column} : (" + " ".join(f'"{token}"*' for token in tokens) + ")"
+                return "FROM iocs_fts JOIN iocs ON iocs.num = iocs_fts.rowid WHERE iocs_fts MATCH ?", (match,)
+            return f"FROM iocs WHERE {column} LIKE ? ESCAPE '\\'", (f"%{escape_like(search_value)}%",)
+        else:
+            return f"FROM iocs WHERE {column} LIKE ? ESCAPE '\\'", (f"{escape_like(search_value)}%",)
+
+    @synchronized
+    def count_filtered(self, search_value=None, filter_type=None):
+        clause, params = self._filter_clause(search_value, filter_type)
+        return self.cursor.execute(f"SELECT COUNT(*) {clause}", params).fetchone()[0]
+
+    @staticmethod
+    def _order_clause(order_by, descending):
+        # num breaks the ties so consecutive windows never overlap or skip rows with the same sort key
+        if order_by not in SORT_COLUMNS:
+            order_by = "num"
+        direction = "DESC" if descending else "ASC"
+        return f"iocs.num {direction}" if order_by == "num" else f"iocs.{order_by} {direction}, iocs.num {direction}"
+
+    @synchronized
+    def fetch_window(self, offset, limit, search_value=None, filter_type=None, order_by="num", descending=False):
+        # One window of the (filtered, sorted) IOC list, used by the virtual table to load only the visible rows
+        self._ensure_sort_index(order_by)
+        order = self._order_clause(order_by, descending)
+        clause, params = self._filter_clause(search_value, filter_type)
+        self.cursor.execute(f"SELECT {LIST_COLUMNS_SQL} {clause} ORDER BY {order} LIMIT ? OFFSET ?", (*params, limit, offset))
         return self.cursor.fetchall()
-    
-    def delete_all(self):
-        logger.print_log(f"[WARNING] Dropping everything from the S1_IOC_manager internal DB. When starting the application is expected to see this line.")   
-        self.cursor.execute("DROP TABLE iocs")
-        self.initialize_schema()
 
+    def iter_filtered_batches(self, search_value=None, filter_type=None, order_by="num", descending=False, columns=None, batch_size=1000):
+        # Generator over the whole (filtered, sorted) IOC list in lists of batch_size tuples, ordered as columns.
+        # It reads through its own read-only connection: WAL gives it a stable snapshot and the
+        # shared connection stays free for the GUI and the syncs while a long export is running.
+        with self.lock:
+            self.open()
+            self._ensure_sort_index(order_by)
+        columns = [column for column in (columns or SORT_COLUMNS) if column in SORT_COLUMNS]
+        order = self._order_clause(order_by, descending)
+        clause, params = self._filter_clause(search_value, filter_type)
+
+        # as_uri percent-encodes the path, a ? # or % in a folder name would otherwise break the URI
+        conn = sqlite3.connect(pathlib.Path(self.path).resolve().as_uri() + "?mode=ro", uri=True)
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(f'iocs.{column}' for column in columns)} {clause} ORDER BY {order}", params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    @synchronized
+    def fetch_detail(self, value):
+        # Full payload of an IOC and the epoch it was stored at, None when not cached
+        return self.cursor.execute("SELECT raw, fetchedAt FROM iocs WHERE value = ? ORDER BY num LIMIT 1", (value,)).fetchone()
+
+    @synchronized
+    def fetch_values_by_filter(self, search_value=None, filter_type=None, source=None, created_before=None):
+        # Values of the IOCs matching the table search, optionally narrowed to a source
+        # and to the IOCs created before an epoch timestamp. Used by the bulk deletion.
+        clause, params = self._filter_clause(search_value, filter_type)
+        conditions = []
+        if source:
+            conditions.append("iocs.source = ?")
+            params = (*params, source)
+        if created_before is not None:
+            conditions.append("iocs.creationTime < ?")
+            params = (*params, created_before)
+        if conditions:
+            clause += (" AND " if " WHERE " in clause else " WHERE ") + " AND ".join(conditions)
+
+        self.cursor.execute(f"SELECT iocs.value {clause} ORDER BY iocs.num", params)
+        return [row[0] for row in self.cursor.fetchall()]
+
+    @synchronized
+    def delete_by_value(self, value):
+        self.cursor.execute("DELETE FROM iocs WHERE value = ?", (value,))
+        self.conn.commit()
+
+    @synchronized
+    def delete_by_values(self, values):
+        # One transaction for the whole list, the FTS triggers keep the search index in sync
+        with self.conn:
+            self.cursor.executemany("DELETE FROM iocs WHERE value = ?", ((value,) for value in values))
+
+    @synchronized
+    def delete_expired(self, now):
+        # Expired IOCs are never returned again by a delta sync, so they are pruned locally
+        self.cursor.execute("DELETE FROM iocs WHERE validUntil < ?", (now,))
+        self.conn.commit()
+        return self.cursor.rowcount
+
+    @synchronized
+    def delete_not_fetched_since(self, epoch):
+        # After a full download: every IOC still on the console has been stored again from epoch on
+        self.cursor.execute("DELETE FROM iocs WHERE fetchedAt < ?", (epoch,))
+        self.conn.commit()
+        return self.cursor.rowcount
+
+    @synchronized
+    def get_state(self, key):
+        row = self.cursor.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    @synchronized
+    def set_state(self, key, value):
+        self.cursor.execute("""
+            INSERT INTO sync_state (key, value) VALUES (?, ?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value
+        """, (key, value))
+        self.conn.commit()
+
+    def get_watermark(self):
+        return self.get_state("updatedAt_watermark")
+
+    def set_watermark(self, watermark):
+        self.set_state("updatedAt_watermark", watermark)
+
+    def get_last_sync(self):
+        # Epoch of the last successful sync: every cached IOC was up to date at that time
+        last_sync = self.get_state("last_sync")
+        return int(last_sync) if last_sync else None
+
+    def set_last_sync(self, epoch):
+        self.set_state("last_sync", str(epoch))
+
+    @synchronized
     def close(self):
         self.conn.close()
+        self.conn = None
+        self.cursor = None
 
 IOC_DB = IOCDB()
-IOC_DB.initialize_schema()
\ No newline at end of file
@@ -0,0 +1,64 @@
+import threading, time
+
+from collections import OrderedDict
+
+from config.config_loader import config
+
+class DetailCache:
+    # LRU cache of the full IOC payloads shown by the detail window, keyed by lowercase value.
+    # An entry is valid for ttl seconds after the payload was known to be up to date, the least
+    # recently used entries are dropped above max_size. Shared between the Tk thread and the workers.
+
+    def __init__(self, max_size=None, ttl=None):
+        # Unset limits are read from config.yml on first use, not when the module is imported
+        self._max_size = max_size
+        self._ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        if self._max_size is None:
+            self._max_size = config.get("detail_cache_size", 256)
+        return self._max_size
+
+    @property
+    def ttl(self):
+        if self._ttl is None:
+            self._ttl = config.get("detail_cache_ttl", 300)
+        return self._ttl
+
+    def is_fresh(self, checked_at):
+        return time.time() - checked_at < self.ttl
+
+    def get(self, value):
+        # Returns the cached payload, None when missing or stale
+        key = value.lower()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if not self.is_fresh(entry[1]):
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, value, ioc, checked_at=None):
+        key = value.lower()
+        with self.lock:
+            self.entries[key] = (ioc, checked_at or time.time())
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def discard(self, values):
+        with self.lock:
+            for value in values:
+                self.entries.pop(value.lower(), None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+detail_cache = DetailCache()
@@ -0,0 +1,125 @@
+import csv, gzip, json, os
+
+from utils.log_handler import logger
+from utils.time_handler import format_timestamp
+from .db_handler import IOC_DB, SORT_COLUMNS
+
+log = logger.get_logger(__name__)
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+EXPORT_COLUMNS = SORT_COLUMNS
+TIME_COLUMNS = ("creationTime", "updatedAt", "validUntil")
+BATCH_SIZE = 5000  # Rows read from the DB and written at a time
+
+def detect_export_format(path):
+    # iocs.csv, iocs.jsonl.gz, iocs.parquet ... Returns (format, gzip)
+    name = path.lower()
+    compress = name.endswith(".gz")
+    if compress:
+        name = name[:-3]
+
+    extension = os.path.splitext(name)[1].lstrip(".")
+    if extension in ("json", "ndjson"):
+        extension = "jsonl"
+    return (extension if extension in EXPORT_FORMATS else "csv"), compress
+
+def __open_text(path, compress):
+    if compress:
+        return gzip.open(path, "wt", newline="", encoding="utf-8")
+    return open(path, "w", newline="", encoding="utf-8")
+
+def __write_csv(path, columns, batches, compress, on_batch):
+    # Timestamps are formatted as in the table, everything else is written as stored
+    time_indexes = [columns.index(column) for column in TIME_COLUMNS if column in columns]
+    with __open_text(path, compress) as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for rows in batches:
+            if time_indexes:
+                rows = [list(row) for row in rows]
+                for row in rows:
+                    for index in time_indexes:
+                        row[index] = format_timestamp(row[index])
+            writer.writerows(rows)
+            if not on_batch(len(rows)):
+                return False
+    return True
+
+def __write_jsonl(path, columns, batches, compress, on_batch):
+    # One object per line, timestamps stay epoch seconds
+    with __open_text(path, compress) as f:
+        for rows in batches:
+            f.write("".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows))
+            if not on_batch(len(rows)):
+                return False
+    return True
+
+def __write_parquet(path, columns, batches, compress, on_batch):
+    # pyarrow is optional and only needed for this format
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs the optional pyarrow package (pip install pyarrow).")
+
+    types = {"num": pa.int64()}
+    types.update({column: pa.timestamp("s", tz="UTC") for column in TIME_COLUMNS})
+    schema = pa.schema([(column, types.get(column, pa.string())) for column in columns])
+
+    # Every batch becomes a row group, only one of them is in memory at a time
+    with pq.ParquetWriter(path, schema, compression="gzip" if compress else "snappy") as writer:
+        for rows in batches:
+            arrays = [pa.array([row[index] for row in rows], type=schema.field(index).type) for index in range(len(columns))]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            if not on_batch(len(rows)):
+                return False
+    return True
+
+WRITERS = {
+    "csv": __write_csv,
+    "jsonl": __write_jsonl,
+    "parquet": __write_parquet
+}
+
+def __export_iocs(path, file_format=None, columns=None, compress=None, search_value=None, filter_type=None,
+                  order_by="num", descending=False, on_progress=None, cancel_event=None):
+    # Streams the IOCs of the local DB matching the query straight to a file. Memory use does not
+    # depend on the number of IOCs and no call is made to S1: sync first for fresh data.
+    # on_progress(written) is called after every batch, cancel_event stops and removes the file.
+    # Returns the number of exported IOCs, None if cancelled.
+    detected_format, detected_compress = detect_export_format(path)
+    file_format = file_format or detected_format
+    compress = detected_compress if compress is None else compress
+    columns = [column for column in (columns or EXPORT_COLUMNS) if column in EXPORT_COLUMNS]
+
+    log.info("Exporting the IOCs to [%s] as %s%s. Columns: %s.", path, file_format, " (gzip)" if compress else "", ", ".join(columns))
+    written = 0
+
+    def on_batch(count):
+        nonlocal written
+        written += count
+        if on_progress is not None:
+            on_progress(written)
+        return cancel_event is None or not cancel_event.is_set()
+
+    batches = IOC_DB.iter_filtered_batches(search_value, filter_type, order_by, descending, columns, BATCH_SIZE)
+    try:
+        completed = WRITERS[file_format](path, columns, batches, compress, on_batch)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    finally:
+        batches.close()
+
+    if not completed:
+        log.warning("Export cancelled after %s IOCs. Removing the partial file [%s].", written, path)
+        os.remove(path)
+        return None
+
+    log.success("%s IOCs exported to [%s].", written, path)
+    return written
+
+def export_iocs(path, file_format=None, columns=None, compress=None, search_value=None, filter_type=None,
+                order_by="num", descending=False, on_progress=None, cancel_event=None):
+    return __export_iocs(path, file_format, columns, compress, search_value, filter_type, order_by, descending, on_progress, cancel_event)
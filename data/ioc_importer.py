@@ -0,0 +1,321 @@
+import csv, itertools, json, os, re
+
+from config.config_loader import config
+from utils.log_handler import logger
+from .ioc_validator import IOC_TYPES, normalize_ioc
+from .S1_IOC_interactor import get_db_ioc_by_values
+
+log = logger.get_logger(__name__)
+
+# Retention option of config.yml used for every IOC type
+RETENTION_OPTIONS = {
+    "IPV4": "ip_retention",
+    "IPV6": "ip_retention",
+    "DNS": "dns_retention",
+    "URL": "url_retention",
+    "MD5": "sha1_retention",
+    "SHA1": "sha1_retention",
+    "SHA256": "sha1_retention"
+}
+
+# STIX 2 patterns: [ipv4-addr:value = '1.2.3.4'], [file:hashes.'SHA-256' = '...'], ...
+STIX_PATTERN = re.compile(r"([a-z0-9-]+):([\w.'-]+)\s*=\s*'((?:[^'\\]|\\.)*)'")
+STIX_TYPES = {
+    "ipv4-addr": "IPV4",
+    "ipv6-addr": "IPV6",
+    "domain-name": "DNS",
+    "url": "URL"
+}
+# A STIX bundle ("type": "bundle") or STIX objects carrying a pattern, told apart from plain JSON
+STIX_HEAD_PATTERN = re.compile(r'"type"\s*:\s*"bundle"|"pattern"\s*:')
+STIX_HASHES = {"MD5": "MD5", "SHA-1": "SHA1", "SHA1": "SHA1", "SHA-256": "SHA256", "SHA256": "SHA256"}
+
+# MISP attribute types carrying an S1 IOC: (S1 type, part of a "first|second" value). None detects IPv4/IPv6.
+# Attributes of any other type (comments, e-mails, ...) are skipped.
+MISP_TYPES = {
+    "ip-src": (None, 0),
+    "ip-dst": (None, 0),
+    "ip-src|port": (None, 0),
+    "ip-dst|port": (None, 0),
+    "domain": ("DNS", 0),
+    "hostname": ("DNS", 0),
+    "domain|ip": ("DNS", 0),
+    "hostname|port": ("DNS", 0),
+    "url": ("URL", 0),
+    "md5": ("MD5", 0),
+    "sha1": ("SHA1", 0),
+    "sha256": ("SHA256", 0),
+    "filename|md5": ("MD5", 1),
+    "filename|sha1": ("SHA1", 1),
+    "filename|sha256": ("SHA256", 1)
+}
+
+# Where the items are in a JSON document, as ijson prefixes: "item" is any element of an array.
+JSON_PREFIXES = ("item", "data.item", "iocs.item")
+STIX_PREFIXES = ("objects.item", "item")
+MISP_PREFIXES = tuple(f"{root}{path}" for root in ("", "response.item.", "item.")
+                      for path in ("Event.Attribute.item", "Event.Object.item.Attribute.item"))
+
+# Column names accepted for the value and the type in CSV and JSON files
+VALUE_KEYS = ("value", "ioc", "indicator")
+TYPE_KEYS = ("type", "ioc_type")
+HEADER_SEPARATOR_PATTERN = re.compile(r"[\s_-]+")
+
+FILE_FORMATS = ("txt", "csv", "json", "jsonl", "stix", "misp")
+SCAN_BATCH_SIZE = 5000  # Values checked against the local DB at a time
+MAX_REJECTS = 100       # Invalid values kept as examples by scan_iocs, the others are only counted
+
+def get_retention_days(ioc_type):
+    return config.get(RETENTION_OPTIONS[ioc_type], 30)
+
+def detect_file_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension in ("jsonl", "ndjson"):
+        return "jsonl"
+    if extension == "json":
+        # STIX bundles and MISP events are JSON documents too, peek at their first bytes to tell them apart
+        with open(path, encoding="utf-8-sig") as f:
+            head = f.read(4096)
+        if '"Event"' in head or '"Attribute"' in head:
+            return "misp"
+        # Not a bare "indicator": it is also an accepted key of plain IOC objects
+        return "stix" if STIX_HEAD_PATTERN.search(head) else "json"
+    if extension == "csv":
+        return "csv"
+    return "txt"
+
+def __first_key(record, keys):
+    for key in keys:
+        for name in (key, key.upper(), key.capitalize()):
+            if record.get(name):
+                return str(record[name]).strip()
+    return None
+
+def __iter_txt(path):
+    # One value per line, empty lines and # comments are ignored
+    with open(path, encoding="utf-8-sig") as f:
+        for line in f:
+            value = line.strip()
+            if value and not value.startswith("#"):
+                yield {"value": value}
+
+def __normalize_header(column):
+    # "Indicator Value", "indicator-value" and "INDICATOR_VALUE" are the same column
+    return HEADER_SEPARATOR_PATTERN.sub("_", column.strip().lower()).strip("_")
+
+def __find_column(header, keys, exclude=None):
+    # Index of the column named after one of the keys: an exact name first, then a name
+    # containing the key as a word ("Indicator Value"). None when no column matches.
+    for exact in (True, False):
+        for key in keys:
+            for i, column in enumerate(header):
+                if i != exclude and (column == key if exact else key in column.split("_")):
+                    return i
+    return None
+
+def __iter_csv(path):
+    # With a header naming a value column every column is kept, otherwise the first column is the value.
+    # A row without a value is yielded anyway, so that it is counted as rejected.
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        first_row = next(reader, None)
+        if first_row is None:
+            return
+
+        header = [__normalize_header(column) for column in first_row]
+        type_index = __find_column(header, TYPE_KEYS)
+        value_index = __find_column(header, VALUE_KEYS, exclude=type_index)
+
+        if value_index is None:
+            rows = itertools.chain([first_row], reader)
+            for row in rows:
+                if any(cell.strip() for cell in row) and not row[0].startswith("#"):
+                    yield {"value": row[0].strip()}
+            return
+
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            record = {column: cell for column, cell in zip(header, row) if column}
+            record["value"] = row[value_index].strip() if value_index < len(row) else ""
+            record["type"] = row[type_index].strip() if type_index is not None and type_index < len(row) else None
+            yield record
+
+def __record_from_json(item):
+    if isinstance(item, str):
+        return {"value": item.strip()}
+    if isinstance(item, dict):
+        value = __first_key(item, VALUE_KEYS)
+        if value:
+            return {**item, "value": value, "type": __first_key(item, TYPE_KEYS)}
+    return None
+
+def __walk_json(node, keys):
+    # Same selection as the ijson prefixes, on a document already in memory
+    if not keys:
+        yield node
+    elif keys[0] == "item":
+        if isinstance(node, list):
+            for child in node:
+                yield from __walk_json(child, keys[1:])
+    elif isinstance(node, dict) and keys[0] in node:
+        yield from __walk_json(node[keys[0]], keys[1:])
+
+def __iter_json_items(path, prefixes):
+    # Yields the JSON values found at any of the prefixes. The document is parsed as a stream with ijson,
+    # one item in memory at a time. Without ijson (not installed from requirements.txt) it is loaded whole.
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+
+    with open(path, "rb") as f:
+        if f.read(3) != b"\xef\xbb\xbf":
+            f.seek(0)
+
+        if ijson is None:
+            log.warning("ijson is not installed, loading [%s] in memory. Install requirements.txt to stream large JSON files.", path)
+            document = json.load(f)
+            for prefix in prefixes:
+                yield from __walk_json(document, prefix.split("."))
+            return
+
+        builder = None
+        item_prefix = None
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == item_prefix and event in ("end_map", "end_array"):
+                    yield builder.value
+                    builder = None
+            elif prefix in prefixes:
+                if event in ("start_map", "start_array"):
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                    item_prefix = prefix
+                elif event not in ("map_key", "end_map", "end_array"):
+                    yield value
+
+def __iter_jsonl(path):
+    with open(path, encoding="utf-8-sig") as f:
+        for line in f:
+            if line.strip():
+                record = __record_from_json(json.loads(line))
+                if record is not None:
+                    yield record
+
+def __iter_json(path):
+    # A list of values or IOC objects, optionally wrapped in {"data": [...]} or {"iocs": [...]}
+    for item in __iter_json_items(path, JSON_PREFIXES):
+        record = __record_from_json(item)
+        if record is not None:
+            yield record
+
+def __iter_stix(path):
+    # Indicators of a STIX 2 bundle, every comparison of the pattern becomes an IOC
+    for item in __iter_json_items(path, STIX_PREFIXES):
+        if not isinstance(item, dict) or item.get("type") != "indicator" or "pattern" not in item:
+            continue
+        for object_type, path_expr, value in STIX_PATTERN.findall(item["pattern"]):
+            if object_type == "file" and path_expr.startswith("hashes."):
+                ioc_type = STIX_HASHES.get(path_expr[len("hashes."):].strip("'").upper())
+            else:
+                ioc_type = STIX_TYPES.get(object_type)
+            yield {"value": value.replace("\\'", "'"), "type": ioc_type,
+                   "name": item.get("name"), "description": item.get("description")}
+
+def __iter_misp(path):
+    # Attributes of a MISP event (or of a list of events), including the ones inside MISP objects
+    skipped = 0
+    for item in __iter_json_items(path, MISP_PREFIXES):
+        mapping = MISP_TYPES.get(item.get("type")) if isinstance(item, dict) else None
+        if mapping is None or not item.get("value"):
+            skipped += 1
+            continue
+
+        ioc_type, part = mapping
+        parts = str(item["value"]).split("|")
+        yield {"value": parts[min(part, len(parts) - 1)].strip(), "type": ioc_type, "description": item.get("comment")}
+
+    if skipped > 0:
+        log.info("%s MISP attributes skipped, their type is not an IOC type supported by S1.", skipped)
+
+PARSERS = {
+    "txt": __iter_txt,
+    "csv": __iter_csv,
+    "json": __iter_json,
+    "jsonl": __iter_jsonl,
+    "stix": __iter_stix,
+    "misp": __iter_misp
+}
+
+def __iter_iocs(path, file_format=None, default_type=None):
+    # Streams the records of a file, every one with a canonical "value" and a validated S1 "type"
+    # (see data/ioc_validator.py). The type given by the file or default_type is checked against
+    # the value, otherwise it is detected. Invalid records are yielded with type None and a "reason".
+    file_format = file_format or detect_file_format(path)
+    log.info("Reading IOCs from [%s] as %s.", path, file_format)
+
+    for record in PARSERS[file_format](path):
+        ioc_type = (record.get("type") or default_type or "").upper()
+        ioc_type, result = normalize_ioc(record["value"], ioc_type if ioc_type in IOC_TYPES else None)
+        record["type"] = ioc_type
+        if ioc_type is None:
+            record["reason"] = result
+        else:
+            record["value"] = result
+        yield record
+
+def __scan_iocs(path, file_format=None, default_type=None, on_progress=None, cancel_event=None):
+    # Streams a file of any size and sorts its IOCs against the local DB in one pass, SCAN_BATCH_SIZE values
+    # at a time. Only the unique (value, type) pairs stay in memory, never the file or its records.
+    # on_progress(read) is called after every batch, cancel_event stops the scan (returns None).
+    # Returns {"new": [(value, type)], "existing": [(value, type)], "rejects": [(value, reason)] (the first MAX_REJECTS),
+    #          "rejected": count, "duplicates": count, "read": count}
+    file_format = file_format or detect_file_format(path)
+    result = {"new": [], "existing": [], "rejects": [], "rejected": 0, "duplicates": 0, "read": 0}
+    seen = set()
+    batch = []
+
+    def check(batch):
+        found = get_db_ioc_by_values([value for value, _ in batch])
+        for value, ioc_type in batch:
+            result["existing" if value.lower() in found else "new"].append((value, ioc_type))
+        if on_progress is not None:
+            on_progress(result["read"])
+
+    for record in __iter_iocs(path, file_format, default_type):
+        if cancel_event is not None and cancel_event.is_set():
+            log.warning("Scan of [%s] cancelled after %s values.", path, result["read"])
+            return None
+
+        result["read"] += 1
+        if record["type"] is None:
+            result["rejected"] += 1
+            if len(result["rejects"]) < MAX_REJECTS:
+                result["rejects"].append((record["value"], record["reason"]))
+            continue
+
+        key = (record["value"], record["type"])
+        if key in seen:
+            result["duplicates"] += 1
+            continue
+        seen.add(key)
+
+        batch.append(key)
+        if len(batch) >= SCAN_BATCH_SIZE:
+            check(batch)
+            batch = []
+
+    if batch:
+        check(batch)
+
+    if result["read"] == 0 and file_format in ("stix", "misp"):
+        log.warning("No IOC found in [%s] read as %s. Is it really a %s file?", path, file_format, file_format.upper())
+
+    log.info("[%s] scanned: %s values read, %s new IOCs, %s already on S1, %s duplicates, %s invalid.", path, result["read"],
+             len(result["new"]), len(result["existing"]), result["duplicates"], result["rejected"])
+    return result
+
+def scan_iocs(path, file_format=None, default_type=None, on_progress=None, cancel_event=None):
+    return __scan_iocs(path, file_format, default_type, on_progress, cancel_event)
@@ -0,0 +1,150 @@
+import ipaddress, re
+
+# Classification and normalization of raw IOC values, shared by the uploader window and the file imports.
+# Every value is refanged, classified with precompiled patterns and rewritten in a canonical form
+# (lowercase hashes and domains, punycode for IDN, compressed IPv6, network address of a CIDR),
+# so that duplicates are found with a plain set lookup.
+
+# IOC types accepted by the S1 threat intelligence API
+IOC_TYPES = ("IPV4", "IPV6", "DNS", "URL", "MD5", "SHA1", "SHA256")
+HASH_TYPES = {32: "MD5", 40: "SHA1", 64: "SHA256"}
+
+HEX_PATTERN = re.compile(r"[0-9a-fA-F]+")
+IPV4_PATTERN = re.compile(r"\d{1,3}(?:\.\d{1,3}){3}(?:/\d{1,2})?")
+IPV4_OCTET = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+CANONICAL_IPV4_PATTERN = re.compile(rf"{IPV4_OCTET}(?:\.{IPV4_OCTET}){{3}}")
+URL_PATTERN = re.compile(r"([a-zA-Z][a-zA-Z0-9+.-]*)://([^/?#\s]+)(\S*)")
+PORT_PATTERN = re.compile(r":(\d{1,5})")
+DOMAIN_PATTERN = re.compile(r"(?=.{1,253}$)(?:[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9])?\.)+(?:[a-z][a-z0-9-]{0,62}|xn--[a-z0-9-]{1,59})")
+SPLIT_PATTERN = re.compile(r"[\s,;]+")
+
+# Defanged forms found in threat reports: hxxp://evil[.]com, 1.2.3(.)4, evil[dot]com, http[:]//, ...
+DEFANG_PATTERN = re.compile(r"\[\.\]|\(\.\)|\{\.\}|\[dot\]|\(dot\)|\[:\]|\[://\]|\[/\]", re.IGNORECASE)
+DEFANG_REPLACEMENTS = {"[.]": ".", "(.)": ".", "{.}": ".", "[dot]": ".", "(dot)": ".", "[:]": ":", "[://]": "://", "[/]": "/"}
+DEFANGED_SCHEME_PATTERN = re.compile(r"(h[xX]{2}p|f[xX]p)(s?)://", re.IGNORECASE)
+DEFANGED_SCHEMES = {"hxxp": "http", "fxp": "ftp"}
+
+def __refang(value):
+    value = value.strip().strip("\"'<>")
+    if "[" in value or "(" in value or "{" in value:
+        value = DEFANG_PATTERN.sub(lambda match: DEFANG_REPLACEMENTS[match.group(0).lower()], value)
+    match = DEFANGED_SCHEME_PATTERN.match(value) if value[:1] in "hHfF" else None
+    if match:
+        value = f"{DEFANGED_SCHEMES[match.group(1).lower()]}{match.group(2).lower()}://{value[match.end():]}"
+    return value
+
+def __split_values(text):
+    # Comma, semicolon, space or newline separated values
+    return [value for value in SPLIT_PATTERN.split(text) if value]
+
+def __normalize_ip(value):
+    # Plain address or CIDR network. A network with host bits set (10.0.0.1/24) is rejected,
+    # a /32 (/128) is the address itself. Returns (type, canonical value) or None.
+    if CANONICAL_IPV4_PATTERN.fullmatch(value):
+        # Fast path for the common case, a dotted quad without leading zeros is already canonical
+        return "IPV4", value
+    try:
+        if "/" in value:
+            network = ipaddress.ip_network(value)
+            canonical = str(network.network_address) if network.prefixlen == network.max_prefixlen else str(network)
+        else:
+            network = ipaddress.ip_address(value)
+            canonical = str(network)
+    except ValueError:
+        return None
+    return ("IPV4" if network.version == 4 else "IPV6"), canonical
+
+def __normalize_domain(value):
+    # Lowercase, no trailing dot, internationalized names in their punycode (IDNA) form
+    value = value.rstrip(".").lower()
+    if not value.isascii():
+        try:
+            value = value.encode("idna").decode("ascii")
+        except UnicodeError:
+            return None
+    return value if DOMAIN_PATTERN.fullmatch(value) else None
+
+def __normalize_url(value):
+    # Scheme and host are case insensitive and get normalized, the path and the query are kept as they are
+    match = URL_PATTERN.fullmatch(value)
+    if match is None:
+        return None
+    scheme, netloc, rest = match.groups()
+
+    userinfo, _, host = netloc.rpartition("@")
+    if host.startswith("["):
+        end = host.find("]")
+        address, port = host[1:end], host[end + 1:]
+        normalized = __normalize_ip(address) if end > 0 else None
+        host = f"[{normalized[1]}]" if normalized and normalized[0] == "IPV6" else None
+    else:
+        host, separator, port = host.partition(":")
+        port = separator + port
+        normalized = __normalize_ip(host) if IPV4_PATTERN.fullmatch(host) else None
+        host = normalized[1] if normalized else __normalize_domain(host)
+
+    if host is None or (port and not ((match := PORT_PATTERN.fullmatch(port)) and int(match.group(1)) <= 65535)):
+        return None
+    return f"{scheme.lower()}://{userinfo + '@' if userinfo else ''}{host}{port}{rest}"
+
+def __normalize_ioc(value, ioc_type=None):
+    # Returns (type, canonical value), or (None, reason) when the value is not a valid IOC.
+    # With ioc_type the value must be of that type, otherwise the type is detected.
+    value = __refang(value)
+    if not value:
+        return None, "empty value"
+
+    if HEX_PATTERN.fullmatch(value):
+        detected = HASH_TYPES.get(len(value))
+        result = (detected, value.lower()) if detected else None
+    elif "://" in value:
+        url = __normalize_url(value)
+        result = ("URL", url) if url else None
+    elif ":" in value or IPV4_PATTERN.fullmatch(value):
+        result = __normalize_ip(value)
+    else:
+        domain = __normalize_domain(value)
+        result = ("DNS", domain) if domain else None
+
+    if result is None:
+        if "/" in value and __normalize_ip(value.split("/", 1)[0]):
+            return None, "not a valid network, the address must be the first one of the range"
+        return None, "not a valid IP, domain, URL or hash"
+    if ioc_type is not None and result[0] != ioc_type:
+        return None, f"looks like a {result[0]}, not a {ioc_type}"
+    return result
+
+def __validate_iocs(values, allowed_types=None):
+    # Validates a whole batch in one pass. Returns (iocs, rejects): iocs is the list of unique
+    # (canonical value, type) in input order, rejects the list of (raw value, reason).
+    # Raw values seen before are not parsed again, duplicates are dropped with a set lookup.
+    seen = set()
+    parsed = {}
+    iocs = []
+    rejects = []
+    normalize = __normalize_ioc
+
+    for raw in values:
+        result = parsed.get(raw)
+        if result is None:
+            result = parsed[raw] = normalize(raw)
+
+        ioc_type, value = result
+        if ioc_type is None:
+            rejects.append((raw, value))
+        elif allowed_types is not None and ioc_type not in allowed_types:
+            rejects.append((raw, f"a {ioc_type} is not accepted here"))
+        elif (value, ioc_type) not in seen:
+            seen.add((value, ioc_type))
+            iocs.append((value, ioc_type))
+
+    return iocs, rejects
+
+def split_values(text):
+    return __split_values(text)
+
+def normalize_ioc(value, ioc_type=None):
+    return __normalize_ioc(value, ioc_type)
+
+def validate_iocs(values, allowed_types=None):
+    return __validate_iocs(values, allowed_types)
@@ -0,0 +1,154 @@
+import threading, time
+
+from config.config_loader import config
+from utils.log_handler import logger
+
+log = logger.get_logger(__name__)
+
+# Request budgets of the S1 API, every call is charged to one of them
+BUDGETS = ("list", "lookup", "create", "delete")
+
+# Default requests per second of every budget, rate_limit_<budget> in config.yml (0 disables the limit)
+DEFAULT_RATES = {"list": 5, "lookup": 10, "create": 5, "delete": 10}
+
+class TokenBucket:
+    # rate tokens per second, up to capacity saved for bursts. Every request takes one token,
+    # a 429 pauses the whole bucket until the Retry-After delay is over.
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        # Takes a token, sleeping until one is available. Returns the seconds waited.
+        if self.rate <= 0:
+            return 0
+        waited = 0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+class ConcurrencyWindow:
+    # Adaptive limit of the requests in flight (AIMD): every success adds 1/limit, so the window grows
+    # by about one request per full window, a 429, 5xx or network error halves it. Errors of the same
+    # burst count once: the window is shrunk at most once every cooldown seconds.
+
+    def __init__(self, minimum, maximum, cooldown=1.0):
+        self.minimum = max(minimum, 1)
+        self.maximum = max(maximum, self.minimum)
+        self.limit = float(max(self.minimum, self.maximum // 2))
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.decreases = 0
+        self.last_decrease = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        # Waits for a free slot. Returns the seconds waited.
+        started = time.monotonic()
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return time.monotonic() - started
+
+    def release(self, congested):
+        # congested None frees the slot without moving the limit
+        with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if congested is False:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif congested and now - self.last_decrease >= self.cooldown:
+                self.limit = max(self.minimum, self.limit / 2)
+                self.last_decrease = now
+                self.decreases += 1
+                log.debug("S1 API congestion, concurrency window reduced to %s requests.", int(self.limit))
+            self.condition.notify_all()
+
+class RateLimiter:
+    # Shared by every call to the S1 API: one token bucket per budget and one concurrency window
+    # for all of them. The limits are read from config.yml by the first call.
+
+    def __init__(self):
+        self.buckets = None
+        self.window = None
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def _configure(self):
+        burst = config.get("rate_limit_burst", 1.0)
+        self.buckets = {}
+        for budget in BUDGETS:
+            rate = config.get(f"rate_limit_{budget}", DEFAULT_RATES[budget])
+            self.buckets[budget] = TokenBucket(rate, rate * burst)
+            self.counters[budget] = {"requests": 0, "throttled": 0, "server_errors": 0, "network_errors": 0, "wait_seconds": 0.0}
+        self.window = ConcurrencyWindow(config.get("min_concurrency", 1), config.get("max_concurrency", 8))
+
+    def acquire(self, budget):
+        # Blocks until the budget has a token and the window a free slot
+        if self.window is None:
+            with self.lock:
+                if self.window is None:
+                    self._configure()
+
+        waited = self.buckets[budget].acquire() + self.window.acquire()
+        with self.lock:
+            counters = self.counters[budget]
+            counters["requests"] += 1
+            counters["wait_seconds"] += waited
+
+    def release(self, budget, status_code=None, retry_after=None):
+        # status_code None means that no answer was received, 0 that the call never reached the network.
+        # retry_after pauses the budget after a 429.
+        if status_code == 0:
+            # Failed before reaching the S1 API: says nothing about its load, the window is left as it is
+            self.window.release(None)
+            return
+
+        congested = status_code is None or status_code == 429 or status_code >= 500
+        if congested:
+            with self.lock:
+                counters = self.counters[budget]
+                if status_code is None:
+                    counters["network_errors"] += 1
+                elif status_code == 429:
+                    counters["throttled"] += 1
+                else:
+                    counters["server_errors"] += 1
+            if status_code == 429 and retry_after:
+                self.buckets[budget].pause(retry_after)
+        self.window.release(congested)
+
+    def metrics(self):
+        # Counters of every budget and the state of the concurrency window
+        if self.window is None:
+            return {"budgets": {}, "concurrency": {}}
+        with self.lock:
+            budgets = {budget: {**counters, "wait_seconds": round(counters["wait_seconds"], 3), "rate": self.buckets[budget].rate}
+                       for budget, counters in self.counters.items()}
+        return {"budgets": budgets,
+                "concurrency": {"limit": int(self.window.limit), "in_flight": self.window.in_flight,
+                                "peak_in_flight": self.window.peak_in_flight, "decreases": self.window.decreases,
+                                "minimum": self.window.minimum, "maximum": self.window.maximum}}
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,130 @@
+import threading, time
+
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+from config.config_loader import config
+from utils.log_handler import logger
+from .rate_limiter import rate_limiter
+
+log = logger.get_logger(__name__)
+
+# Status codes worth another try: rate limiting and transient server side errors
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# A POST may have been applied even if its answer was a 5xx or never arrived: replaying it would create
+# the IOCs twice or extend their validity. Other methods are retried on every transient failure, a POST
+# only on 429 and when the connection could not even be opened.
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+# Rate limiter budget of every method, lookups of a single value pass budget="lookup"
+METHOD_BUDGETS = {"GET": "list", "POST": "create", "DELETE": "delete"}
+
+class S1Client:
+    # Shared HTTP client for the SentinelOne management API.
+    # One requests.Session keeps the TLS connections alive in a pool, the auth header is set once
+    # and every call gets a timeout and retries with exponential backoff honouring Retry-After.
+    # requests and the session are only set up by the first call, so the GUI can start without them.
+    # Every attempt goes through the shared rate limiter (data/rate_limiter.py).
+
+    def __init__(self):
+        self.session = None
+        self.lock = threading.Lock()
+
+    def _open(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.exceptions import NewConnectionError
+
+        self.base_url = config.s1_api
+        self.timeout = (config.get("http_connect_timeout", 10), config.get("http_timeout", 60))
+        self.max_retries = config.get("http_max_retries", 5)
+        self.backoff_factor = config.get("http_backoff_factor", 1.0)
+        self.max_backoff = config.get("http_max_backoff", 60)
+        self.network_errors = (requests.ConnectionError, requests.Timeout)
+        self.connect_timeout = requests.ConnectTimeout
+        self.connection_refused = NewConnectionError
+
+        pool_size = config.get("http_pool_size", 10)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({'Authorization': f'ApiToken {config.s1_token}'})
+        self.session = session
+
+    def _retry_delay(self, attempt, res=None):
+        # Retry-After may be a number of seconds or an HTTP date
+        retry_after = res.headers.get("Retry-After") if res is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                try:
+                    delay = (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()
+                    return min(max(delay, 0), self.max_backoff)
+                except (TypeError, ValueError):
+                    pass
+
+        return min(self.backoff_factor * (2 ** attempt), self.max_backoff)
+
+    def _not_sent(self, error):
+        # True when the request never reached the server: connect timeout or refused connection
+        if isinstance(error, self.connect_timeout):
+            return True
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, self.connection_refused)
+
+    def request(self, method, endpoint, budget=None, **kwargs):
+        # Returns the last response received. Raises the last requests exception if no answer was ever received.
+        if self.session is None:
+            with self.lock:
+                if self.session is None:
+                    self._open()
+
+        kwargs.setdefault("timeout", self.timeout)
+        url = f"{self.base_url}{endpoint}"
+        budget = budget or METHOD_BUDGETS.get(method, "list")
+
+        for attempt in range(self.max_retries + 1):
+            rate_limiter.acquire(budget)
+            try:
+                res = self.session.request(method, url, **kwargs)
+            except self.network_errors as e:
+                rate_limiter.release(budget)
+                if attempt >= self.max_retries or (method not in IDEMPOTENT_METHODS and not self._not_sent(e)):
+                    raise
+                delay = self._retry_delay(attempt)
+                log.warning("%s %s failed (%s). Retrying in %.1fs (%s/%s).", method, endpoint, type(e).__name__, delay, attempt + 1, self.max_retries)
+                time.sleep(delay)
+                continue
+            except BaseException:
+                # Not a network failure (bad request arguments, interrupted): free the slot without shrinking the window
+                rate_limiter.release(budget, 0)
+                raise
+
+            retry = res.status_code in RETRY_STATUS_CODES and (method in IDEMPOTENT_METHODS or res.status_code == 429)
+            delay = self._retry_delay(attempt, res) if retry else None
+            rate_limiter.release(budget, res.status_code, delay)
+            if delay is None or attempt >= self.max_retries:
+                return res
+
+            log.warning("%s %s answered with status code [%s]. Retrying in %.1fs (%s/%s).", method, endpoint, res.status_code, delay, attempt + 1, self.max_retries)
+            time.sleep(delay)
+
+    def get(self, endpoint, budget=None, **kwargs):
+        return self.request("GET", endpoint, budget, **kwargs)
+
+    def post(self, endpoint, budget=None, **kwargs):
+        return self.request("POST", endpoint, budget, **kwargs)
+
+    def delete(self, endpoint, budget=None, **kwargs):
+        return self.request("DELETE", endpoint, budget, **kwargs)
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+s1_client = S1Client()
@@ -1,6 +1,11 @@
 import tkinter as tk
 import customtkinter as ctk
 
+from collections import Counter
+
+from utils.time_handler import format_timestamp
+from data.db_handler import FILTER_COLUMNS
+
 class YesNoDialogBox(ctk.CTkToplevel):
     def __init__(self, parent, title, message):
         super().__init__(parent)
@@ -148,4 +153,201 @@ class ErrorDialogBox(ctk.CTkToplevel):
 
     def show(self):
         self.wait_window()
-        return None
\ No newline at end of file
+        return None
+
+class ExistingIOCReviewDialogBox(ctk.CTkToplevel):
+    # One consolidated review for all the pending IOCs already available on S1
+    def __init__(self, parent, existing):
+        super().__init__(parent)
+        self.title("IOCs Already uploaded on S1")
+
+        self.geometry(f"700x450")
+        self.resizable(False, False)
+
+        self.wait_visibility()
+        self.grab_set()  # Make it modal
+
+        # Message
+        self.label = ctk.CTkLabel(self, text=f"{len(existing)} IOCs are already available on S1. Do you want to update them or skip them?", justify="center")
+        self.label.pack(side=tk.TOP, fill="both", padx=5)
+
+        self.list_box = ctk.CTkTextbox(self, state="disabled", text_color="black", font=("Consolas", 10), fg_color="light grey")
+        self.list_box.pack(side=tk.TOP, expand=True, fill="both", padx=10, pady=10)
+
+        self.list_box.configure(state="normal") # Temporarily enable
+        for ioc in existing:
+            self.list_box.insert("end", text=f"{ioc.get('type', '')}\t{ioc.get('value', '')}\t{ioc.get('name', '')}\t{format_timestamp(ioc.get('updatedAt'))}\n")
+        self.list_box.configure(state="disabled")
+
+        # Buttons frame
+        btn_frame = ctk.CTkFrame(self, fg_color="transparent")
+        btn_frame.pack(pady=(0,20))
+
+        self.choice = None
+        update_btn = ctk.CTkButton(btn_frame, text="Update all", width=80, command=self._on_update)
+        update_btn.pack(side="left", padx=10)
+        skip_btn = ctk.CTkButton(btn_frame, text="Skip existing", width=80, command=self._on_skip)
+        skip_btn.pack(side="left", padx=10)
+        cancel_btn = ctk.CTkButton(btn_frame, text="Cancel", width=80, command=self._on_cancel)
+        cancel_btn.pack(side="right", padx=10)
+
+        self.protocol("WM_DELETE_WINDOW", self._on_cancel)  # Treat window-close as Cancel
+
+    def _on_update(self):
+        self.choice = "update"
+        self.destroy()
+
+    def _on_skip(self):
+        self.choice = "skip"
+        self.destroy()
+
+    def _on_cancel(self):
+        self.choice = None
+        self.destroy()
+
+    def show(self):
+        self.wait_window()
+        return self.choice
+
+class DeleteFilterDialogBox(ctk.CTkToplevel):
+    # Asks the criteria of a bulk deletion. show() returns the arguments of get_db_ioc_values_by_filter or None
+    def __init__(self, parent, search_value=None, filter_type="Value"):
+        super().__init__(parent)
+        self.title("Delete IOCs by filter")
+
+        self.geometry(f"460x260")
+        self.resizable(False, False)
+
+        self.wait_visibility()
+        self.grab_set()  # Make it modal
+
+        # Message
+        self.label = ctk.CTkLabel(self, text="Every IOC matching ALL the filled criteria will be deleted from S1.", justify="center")
+        self.label.pack(pady=(15,10), padx=10)
+
+        fields = ctk.CTkFrame(self, fg_color="transparent")
+        fields.pack(padx=10, fill="x")
+        fields.grid_columnconfigure(1, weight=1)
+
+        ctk.CTkLabel(fields, text="Search").grid(row=0, column=0, sticky="w", padx=5, pady=3)
+        self.search_entry = ctk.CTkEntry(fields, placeholder_text="Optional, same as the table search")
+        self.search_entry.grid(row=0, column=1, sticky="ew", padx=5, pady=3)
+        if search_value:
+            self.search_entry.insert(0, search_value)
+
+        self.search_type = ctk.CTkOptionMenu(fields, values=list(FILTER_COLUMNS), width=110)
+        self.search_type.set(filter_type)
+        self.search_type.grid(row=0, column=2, padx=5, pady=3)
+
+        ctk.CTkLabel(fields, text="Source").grid(row=1, column=0, sticky="w", padx=5, pady=3)
+        self.source_entry = ctk.CTkEntry(fields, placeholder_text="Optional, exact source name")
+        self.source_entry.grid(row=1, column=1, columnspan=2, sticky="ew", padx=5, pady=3)
+
+        ctk.CTkLabel(fields, text="Older than").grid(row=2, column=0, sticky="w", padx=5, pady=3)
+        self.days_entry = ctk.CTkEntry(fields, placeholder_text="Optional, days since creation")
+        self.days_entry.grid(row=2, column=1, columnspan=2, sticky="ew", padx=5, pady=3)
+
+        self.error_label = ctk.CTkLabel(self, text="", text_color="firebrick4")
+        self.error_label.pack()
+
+        # Buttons frame
+        btn_frame = ctk.CTkFrame(self, fg_color="transparent")
+        btn_frame.pack(pady=(0,15))
+
+        self.choice = None
+        ok_btn = ctk.CTkButton(btn_frame, text="Find IOCs", width=80, command=self._on_ok)
+        ok_btn.pack(side="left", padx=10)
+        cancel_btn = ctk.CTkButton(btn_frame, text="Cancel", width=80, command=self._on_cancel)
+        cancel_btn.pack(side="right", padx=10)
+
+        self.protocol("WM_DELETE_WINDOW", self._on_cancel)  # Treat window-close as Cancel
+
+    def _on_ok(self):
+        search_value = self.search_entry.get().strip() or None
+        source = self.source_entry.get().strip() or None
+        days = self.days_entry.get().strip()
+
+        if days and not days.isdigit():
+            self.error_label.configure(text="Older than must be a number of days.")
+            return
+        if search_value is None and source is None and not days:
+            self.error_label.configure(text="Fill at least one criterion.")
+            return
+
+        self.choice = {"value": search_value, "filter_type": self.search_type.get(), "source": source,
+                       "older_than_days": int(days) if days else None}
+        self.destroy()
+
+    def _on_cancel(self):
+        self.choice = None
+        self.destroy()
+
+    def show(self):
+        self.wait_window()
+        return self.choice
+
+class ImportSummaryDialogBox(ctk.CTkToplevel):
+    # One confirmation for a whole file import, built from the result of data.ioc_importer.scan_iocs.
+    # show() returns "skip" (new IOCs only), "update" (new and existing IOCs) or None
+    def __init__(self, parent, file_name, scan):
+        super().__init__(parent)
+        self.title("Import IOCs")
+
+        self.geometry(f"560x420")
+        self.resizable(False, False)
+
+        self.wait_visibility()
+        self.grab_set()  # Make it modal
+
+        new, existing = len(scan["new"]), len(scan["existing"])
+
+        # Message
+        self.label = ctk.CTkLabel(self, text=f"{scan['read']} values read from {file_name}.", justify="center")
+        self.label.pack(side=tk.TOP, fill="both", padx=5, pady=(10, 0))
+
+        self.summary_box = ctk.CTkTextbox(self, state="disabled", text_color="black", font=("Consolas", 10), fg_color="light grey")
+        self.summary_box.pack(side=tk.TOP, expand=True, fill="both", padx=10, pady=10)
+
+        by_type = Counter(ioc_type for _, ioc_type in scan["new"])
+        lines = [f"New IOCs:\t\t{new}" + (f" ({', '.join(f'{count} {ioc_type}' for ioc_type, count in by_type.most_common())})" if new else ""),
+                 f"Already on S1:\t\t{existing}",
+                 f"Duplicates in the file:\t{scan['duplicates']}",
+                 f"Invalid values:\t\t{scan['rejected']}"]
+        if scan["rejects"]:
+            lines += ["", "Invalid values (ignored):"] + [f"[{value}]: {reason}" for value, reason in scan["rejects"]]
+            if scan["rejected"] > len(scan["rejects"]):
+                lines.append(f"... and {scan['rejected'] - len(scan['rejects'])} more.")
+
+        self.summary_box.configure(state="normal") # Temporarily enable
+        self.summary_box.insert("end", text="\n".join(lines))
+        self.summary_box.configure(state="disabled")
+
+        # Buttons frame
+        btn_frame = ctk.CTkFrame(self, fg_color="transparent")
+        btn_frame.pack(pady=(0,20))
+
+        self.choice = None
+        skip_btn = ctk.CTkButton(btn_frame, text=f"Upload new ({new})", width=80, command=self._on_skip, state="normal" if new else "disabled")
+        skip_btn.pack(side="left", padx=10)
+        update_btn = ctk.CTkButton(btn_frame, text=f"Upload and update existing ({new + existing})", width=80, command=self._on_update, state="normal" if existing else "disabled")
+        update_btn.pack(side="left", padx=10)
+        cancel_btn = ctk.CTkButton(btn_frame, text="Cancel", width=80, command=self._on_cancel)
+        cancel_btn.pack(side="right", padx=10)
+
+        self.protocol("WM_DELETE_WINDOW", self._on_cancel)  # Treat window-close as Cancel
+
+    def _on_update(self):
+        self.choice = "update"
+        self.destroy()
+
+    def _on_skip(self):
+        self.choice = "skip"
+        self.destroy()
+
+    def _on_cancel(self):
+        self.choice = None
+        self.destroy()
+
+    def show(self):
+        self.wait_window()
+        return self.choice
@@ -0,0 +1,91 @@
+import queue, threading, traceback
+
+from concurrent.futures import ThreadPoolExecutor
+
+from config.config_loader import config
+from utils.log_handler import logger
+
+log = logger.get_logger(__name__)
+
+class Task:
+    # Handle given to the job running in the background. The job uses it to report progress
+    # and to check if the user asked to stop. The GUI uses it to cancel the job.
+    def __init__(self, runner, name):
+        self.runner = runner
+        self.name = name
+        self.cancel_event = threading.Event()
+        self.done = False
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        if not self.done:
+            log.warning("Cancel requested for background task [%s].", self.name)
+            self.cancel_event.set()
+
+    def report_progress(self, *payload):
+        # Called from the worker thread, the on_progress callback runs later on the Tk thread
+        self.runner._events.put((self, "progress", payload))
+
+class TaskRunner:
+    # Runs blocking jobs (API calls, DB syncs) on a thread pool so the Tk event loop never freezes.
+    # Tk is not thread safe: workers only push events to a queue, which is drained on the Tk
+    # thread with after(), and the callbacks are called from there.
+    def __init__(self, widget, max_workers=None, poll_ms=50):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or config.get("gui_workers", 4), thread_name_prefix="S1_IOC_worker")
+        self._events = queue.Queue()
+        self._callbacks = {}
+        self._after_id = self.widget.after(self.poll_ms, self._poll)
+
+    def submit(self, name, fn, *args, on_done=None, on_error=None, on_progress=None, **kwargs):
+        # fn is called as fn(task, *args, **kwargs) on a worker thread
+        task = Task(self, name)
+        self._callbacks[task] = (on_done, on_error, on_progress)
+        log.info("Starting background task [%s].", name)
+
+        def run():
+            try:
+                self._events.put((task, "done", (fn(task, *args, **kwargs),)))
+            except Exception as e:
+                log.error("Background task [%s] failed.\n%s", name, traceback.format_exc())
+                self._events.put((task, "error", (e,)))
+
+        self.executor.submit(run)
+        return task
+
+    def cancel_all(self):
+        for task in list(self._callbacks):
+            task.cancel()
+
+    def _poll(self):
+        # Rescheduled first: a callback may open a modal dialog and block here until it is closed
+        self._after_id = self.widget.after(self.poll_ms, self._poll)
+
+        while True:
+            try:
+                task, kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+
+            on_done, on_error, on_progress = self._callbacks.get(task, (None, None, None))
+            if kind == "progress":
+                callback = on_progress
+            else:
+                task.done = True
+                self._callbacks.pop(task, None)
+                callback = on_done if kind == "done" else on_error
+
+            if callback is not None:
+                try:
+                    callback(*payload)
+                except Exception:
+                    log.error("Callback of background task [%s] failed.\n%s", task.name, traceback.format_exc())
+
+    def shutdown(self):
+        self.cancel_all()
+        self.widget.after_cancel(self._after_id)
+        self.executor.shutdown(wait=False)
@@ -1,64 +1,23 @@
-import validators, json
-import tkinter as tk
+import os
 import customtkinter as ctk
-from tkinter import messagebox
+from tkinter import filedialog
 from datetime import datetime
 
-from utils.log_handler import logger 
-from config.config_loader import config
+from utils.log_handler import logger, parse_level, DEBUG, ERROR, SUCCESS
 
-from gui.custom_messagebox import YesNoDialogBox, InfoDialogBox, ErrorDialogBox
+from gui.custom_messagebox import YesNoDialogBox, InfoDialogBox, ErrorDialogBox, ExistingIOCReviewDialogBox, ImportSummaryDialogBox
 
-from data.S1_IOC_interactor import upload_ioc_to_s1, get_s1_ioc_by_value
+from data.S1_IOC_interactor import upload_iocs_to_s1, sync_s1_ioc, get_db_ioc_by_values
+from data.ioc_validator import validate_iocs, split_values
+from data.ioc_importer import get_retention_days, scan_iocs
 
 ctk.set_appearance_mode("light")
 ctk.set_default_color_theme("green")
 
-class UpdateIOCDialogBox(ctk.CTkToplevel):
-    def __init__(self, parent, data):
-        super().__init__(parent)
-        self.title("IOC Already uploaded on S1")
-
-        self.geometry(f"500x450")
-        self.resizable(False, False)
-
-        self.wait_visibility()
-        self.grab_set()  # Make it modal
-
-        # Message
-        self.label = ctk.CTkLabel(self, text="The IOC is already available on S1 with the following value. Do you want to update it?", justify="center")
-        self.label.pack(side=tk.TOP, fill="both", padx=5)
-
-        self.json_box = ctk.CTkTextbox(self, state="disabled", text_color="black", font=("Consolas", 10), fg_color="light grey")
-        self.json_box.pack(side=tk.TOP, expand=True, fill="both", padx=10, pady=10)
-
-        self.json_box.configure(state="normal") # Temporarily enable
-        self.json_box.insert("end", text=f"{data}")
-        self.json_box.configure(state="disabled")
-
-        # Buttons frame
-        btn_frame = ctk.CTkFrame(self, fg_color="transparent")
-        btn_frame.pack(pady=(0,20))
-
-        self.choice = None
-        yes_btn = ctk.CTkButton(btn_frame, text="Update", width=80, command=self._on_yes)
-        yes_btn.pack(side="left", padx=10)
-        no_btn = ctk.CTkButton(btn_frame, text="Cancel", width=80, command=self._on_no)
-        no_btn.pack(side="right", padx=10)
-
-        self.protocol("WM_DELETE_WINDOW", self._on_no)  # Treat window-close as No
-
-    def _on_yes(self):
-        self.choice = True
-        self.destroy()
+log = logger.get_logger(__name__)
 
-    def _on_no(self):
-        self.choice = False
-        self.destroy()
-
-    def show(self):
-        self.wait_window()
-        return self.choice
+# Log box tag of every severity, INFO and WARNING use the default text style
+LOG_BOX_TAGS = {DEBUG: ("debug_text",), ERROR: ("error_text",), SUCCESS: ("success_text",)}
 
 class UserInputFrame(ctk.CTkFrame):
     def __init__(self, master, title:str, example:str):
@@ -73,16 +32,35 @@ class UserInputFrame(ctk.CTkFrame):
         self.field = ctk.CTkEntry(self, placeholder_text=example)
         self.field.grid(row=1, column=0, padx=10, pady=(10, 0), sticky="ew")
 
+MAX_REJECTS_SHOWN = 10     # Invalid values listed in the error dialog, all of them go to the log box
+MAX_LOGGED_RESULTS = 200   # Uploaded IOCs listed one by one in the log box, failures are always listed
+
+IMPORT_FILE_TYPES = [
+    ("IOC files", "*.txt *.csv *.json *.jsonl"),
+    ("Text, one IOC per line", "*.txt"),
+    ("CSV", "*.csv"),
+    ("JSON, STIX 2 bundle or MISP event", "*.json"),
+    ("JSON lines", "*.jsonl"),
+    ("All files", "*.*")
+]
+
 class UploaderAppWindow(ctk.CTkToplevel):
-    ip_list:[str]
-    domain_list:[str]
-    hash_list:[str]
-    url_list:[str]
+    # Validated IOCs of every input field as (canonical value, S1 type)
+    ip_list:[(str, str)]
+    domain_list:[(str, str)]
+    hash_list:[(str, str)]
+    url_list:[(str, str)]
 
     def __init__(self, parent):
         super().__init__(parent)
         self.title("S1 IOC Uploader")
 
+        # Lookups and uploads run in the background, see gui/task_runner.py
+        self.tasks = parent.winfo_toplevel().tasks
+        self.running_tasks = []
+        self._clear_ioc_lists()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
         self.geometry("500x650")
 
         self.wait_visibility()
@@ -110,11 +88,14 @@ class UploaderAppWindow(ctk.CTkToplevel):
         self.url_frame = UserInputFrame(self, "URL", "https://malware.org")
         self.url_frame.grid(row=5, column=0, padx=10, pady=(10, 0), sticky="nsew")
 
-        self.hash_frame = UserInputFrame(self, "SHA1", "44D88612FEA8A8F36DE82E1278ABB02F")
+        self.hash_frame = UserInputFrame(self, "Hash (MD5, SHA1, SHA256)", "3395856CE81F2B7382DEE72602F798B642F14140")
         self.hash_frame.grid(row=5, column=1, padx=10, pady=(10, 0), sticky="nsew")
 
         self.generate_button = ctk.CTkButton(self, text="Validate input", command=self.onclick_generate_button)
-        self.generate_button.grid(row=6, column=0, padx=10, pady=10, sticky="ews", columnspan=2)
+        self.generate_button.grid(row=6, column=0, padx=10, pady=10, sticky="ews")
+
+        self.import_button = ctk.CTkButton(self, text="Import file 📂", command=self.onclick_import_file)
+        self.import_button.grid(row=6, column=1, padx=10, pady=10, sticky="ews")
 
         self.log_box = ctk.CTkTextbox(self)
         self.log_box.grid(row=7, padx=10, pady=10, sticky="ew", columnspan=2)
@@ -124,36 +105,65 @@ class UploaderAppWindow(ctk.CTkToplevel):
         self.log_box.tag_config('success_text', foreground='dark green')
 
         self.s1_button = ctk.CTkButton(self, text="Send to S1", command=self.onclick_upload_ioc, state="disabled")
-        self.s1_button.grid(row=8, column=0, padx=10, pady=10, sticky="ews", columnspan=2)
+        self.s1_button.grid(row=8, column=0, padx=10, pady=10, sticky="ews")
+
+        self.cancel_button = ctk.CTkButton(self, text="Cancel ✋", command=self.cancel_tasks, state="disabled")
+        self.cancel_button.grid(row=8, column=1, padx=10, pady=10, sticky="ews")
 
         self.print_log("[INFO] Canvas generated.")
 
     def show(self):
         self.wait_window()  
         return None
+
+    def on_close(self):
+        self.cancel_tasks()
+        self.destroy()
+
+    def cancel_tasks(self):
+        for task in self.running_tasks:
+            task.cancel()
+
+    def _run_task(self, name, fn, *args, on_done=None, on_progress=None):
+        # Submits a background job and keeps the buttons in sync with it
+        def finished(task, callback, *result):
+            self.running_tasks.remove(task)
+            if not self.winfo_exists():
+                return
+            if len(self.running_tasks) == 0:
+                # Send to S1 only works on validated manual input, a file import leaves it disabled
+                self.s1_button.configure(state="normal" if self._has_ioc_lists() else "disabled")
+                self.import_button.configure(state="normal")
+                self.cancel_button.configure(state="disabled")
+            if callback is not None:
+                callback(*result)
+
+        def progress(*payload):
+            if self.winfo_exists() and on_progress is not None:
+                on_progress(*payload)
+
+        self.s1_button.configure(state="disabled")
+        self.import_button.configure(state="disabled")
+        self.cancel_button.configure(state="normal")
+
+        task = self.tasks.submit(name, fn, *args,
+                                 on_done=lambda result: finished(task, on_done, result),
+                                 on_error=lambda e: finished(task, None),
+                                 on_progress=progress)
+        self.running_tasks.append(task)
+        return task
     
     def print_log(self, message):
-        logger.print_log(message)
-
-        if("DEBUG" in message):
-            self.log_box.configure(state="normal") # Temporarily enable
-            self.log_box.insert("end", text=f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}\n", tags=("debug_text"))
-            self.log_box.configure(state="disabled")
-        elif("ERROR" in message):
-            self.log_box.configure(state="normal") # Temporarily enable
-            self.log_box.insert("end", text=f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}\n", tags=("error_text"))
-            self.log_box.configure(state="disabled")
-        elif("SUCCESS" in message):
-            self.log_box.configure(state="normal") # Temporarily enable
-            self.log_box.insert("end", text=f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}\n", tags=("success_text"))
-            self.log_box.configure(state="disabled")
-        else:
-            self.log_box.configure(state="normal") # Temporarily enable
-            self.log_box.insert("end", text=f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}\n")
-            self.log_box.configure(state="disabled")
+        # The log box always shows the message, the severity comes only from the leading [LEVEL] prefix
+        level, text = parse_level(message)
+        log.log(level, "%s", text)
 
-    # Handles the validation of the user input, does not check the actual values but only if the fields are populated
-    def _verify_user_input(self):
+        self.log_box.configure(state="normal") # Temporarily enable
+        self.log_box.insert("end", text=f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}\n", tags=LOG_BOX_TAGS.get(level, ()))
+        self.log_box.configure(state="disabled")
+
+    # Title and description are given to every uploaded IOC, typed or imported
+    def _verify_title_description(self):
         # Debug message indicating the start of title/description validation
         self.print_log("[INFO] Checking title and description inputs.")
         
@@ -166,6 +176,12 @@ class UploaderAppWindow(ctk.CTkToplevel):
         
         # Debug message indicating title/description validation passed
         self.print_log("[INFO] Title and description inputs are valid.")
+        return True
+
+    # Handles the validation of the user input, does not check the actual values but only if the fields are populated
+    def _verify_user_input(self):
+        if not self._verify_title_description():
+            return False
 
         # Debug message indicating the start of domain/IP/hash/URL validation
         self.print_log("[INFO] Checking domain, IP, hash, and URL inputs.")
@@ -180,111 +196,190 @@ class UploaderAppWindow(ctk.CTkToplevel):
         self.print_log("[INFO] Domain, IP, hash, and URL inputs are populated.")
         return True
 
-    @staticmethod
-    def _get_input_value_list(values:str, validator):
-        # Same logic as domain list+
-        result_list = []
-        if values != "":
-            value_list = values.replace(" ", "")
-            value_list = value_list.split(",")
-            for value in value_list:
-                if validator(value):
-                    result_list.append(value)
-                    result_list = list(dict.fromkeys(result_list))
-                else:
-                    self.print_log(f"[ERROR] Error: [{value}] is not a valid IOC. This IOC will be ignored.")
-                    ErrorDialogBox(self, title="IOC checking Error", message=f"[{value}]: is not a valid IOC. This IOC will be ignored.").show()
-            
-            return result_list
-        else:
-            return []
+    def _get_input_value_list(self, values:str, allowed_types):
+        # The whole field is validated and normalized in one pass (refanged, deduplicated),
+        # see data/ioc_validator.py. Returns the list of (canonical value, type).
+        iocs, rejects = validate_iocs(split_values(values), allowed_types)
+
+        for value, reason in rejects:
+            self.print_log(f"[ERROR] Error: [{value}] is not a valid IOC ({reason}). This IOC will be ignored.")
+        if len(rejects) > 0:
+            shown = "\n".join(f"[{value}]: {reason}" for value, reason in rejects[:MAX_REJECTS_SHOWN])
+            more = f"\n... and {len(rejects) - MAX_REJECTS_SHOWN} more." if len(rejects) > MAX_REJECTS_SHOWN else ""
+            ErrorDialogBox(self, title="IOC checking Error", message=f"{len(rejects)} values are not valid IOCs and will be ignored:\n{shown}{more}").show()
+
+        return iocs
+
+
+    def _clear_ioc_lists(self):
+        self.ip_list = []
+        self.domain_list = []
+        self.hash_list = []
+        self.url_list = []
 
+    def _has_ioc_lists(self):
+        return len(self.ip_list) > 0 or len(self.domain_list) > 0 or len(self.hash_list) > 0 or len(self.url_list) > 0
 
     def onclick_generate_button(self):
         # Function which handle the generation of file 
 
-        # Start input validation
+        # Start input validation, the previously validated IOCs are dropped whatever the outcome
         self.print_log("[INFO] Validating user input.")
+        self._clear_ioc_lists()
+        self.s1_button.configure(state="disabled")
         
         # Proceed only if validation passes
         if self._verify_user_input():
             # Extract data from user input fields
-            self.ip_list = self._get_input_value_list(self.ip_address_frame.field.get(), validators.ip_address.ipv4)
-            self.domain_list = self._get_input_value_list(self.domain_frame.field.get(), validators.domain)
-            self.hash_list = self._get_input_value_list(self.hash_frame.field.get(), validators.hashes.sha1)
-            self.url_list = self._get_input_value_list(self.url_frame.field.get(), validators.url)
+            self.ip_list = self._get_input_value_list(self.ip_address_frame.field.get(), ("IPV4", "IPV6"))
+            self.domain_list = self._get_input_value_list(self.domain_frame.field.get(), ("DNS",))
+            self.hash_list = self._get_input_value_list(self.hash_frame.field.get(), ("MD5", "SHA1", "SHA256"))
+            self.url_list = self._get_input_value_list(self.url_frame.field.get(), ("URL",))
 
             # Log that the input has been validated and the UI will be updated
             self.print_log("[SUCCESS] User input has been validated. Enabling lower buttons.")
 
             # Enable SentinelOne upload button only if any of the IOC lists are populated
-            if(len(self.ip_list) > 0 or len(self.domain_list) > 0 or len(self.hash_list) > 0 or len(self.url_list) > 0):
+            if self._has_ioc_lists():
                 self.s1_button.configure(state="normal")
-            else:
-                self.s1_button.configure(state="disabled")
-
-    def _check_ioc_presence(self, ioc_value):
-        self.print_log(f"[INFO] Checking if IOC [{ioc_value}] is already uploaded on SentinelOne.")
-
-        ioc_value = get_s1_ioc_by_value(ioc_value)
-
-        if ioc_value != None:
-            self.print_log(f"[INFO] The IOC is already uploaded on SentinelOne. Asking if an update is needed.")
-            ioc_value = json.dumps(ioc_value, indent=2)
-            user_choice = UpdateIOCDialogBox(self, data=ioc_value)
-            user_choice = user_choice.show()
 
-            if user_choice:
-                self.print_log(f"[INFO] User choose to update the IOC. Moving on with the upload.")
-                return True
-            else:
-                self.print_log(f"[INFO] User choose to not update the IOC. Aborting the upload.")
-                return False
-        
-        self.print_log(f"[INFO] The IOC is new. Moving on with the upload.")
-        return True
+    @staticmethod
+    def _lookup_presence(task, values):
+        # Runs on a worker thread. A delta sync brings the local store up to date (a single GET when
+        # nothing changed), then the whole batch is resolved with indexed lookups on the store.
+        # Returns {lowercase value: IOC found on S1}, None if cancelled
+        sync_s1_ioc(cancel_event=task.cancel_event)
+        if task.cancelled:
+            return None
+        return get_db_ioc_by_values(values)
+
+    def onclick_import_file(self):
+        # Bulk import: the file is streamed and checked against the local store in the background,
+        # then a single summary decides what is uploaded
+        if not self._verify_title_description():
+            return
+
+        path = filedialog.askopenfilename(parent=self, title="Import IOCs", filetypes=IMPORT_FILE_TYPES)
+        if not path:
+            self.print_log("[INFO] File import cancelled.")
+            return
+
+        # The file replaces the manual input, Send to S1 stays disabled until the fields are validated again
+        self._clear_ioc_lists()
+        self.print_log(f"[INFO] Reading the IOCs of [{path}].")
+        self._run_task("file import", self._scan_file, path,
+                       on_done=lambda scan: self._on_file_scanned(path, scan),
+                       on_progress=lambda read: self.print_log(f"[INFO] Import: {read} values read."))
 
+    @staticmethod
+    def _scan_file(task, path):
+        # Runs on a worker thread. Same delta sync as _lookup_presence, then one streaming pass over the file.
+        # Returns the result of scan_iocs, None if cancelled
+        sync_s1_ioc(cancel_event=task.cancel_event)
+        if task.cancelled:
+            return None
+        return scan_iocs(path, on_progress=task.report_progress, cancel_event=task.cancel_event)
+
+    def _on_file_scanned(self, path, scan):
+        if scan is None:
+            self.print_log("[WARNING] File import cancelled. No IOC will be uploaded.")
+            return
+
+        for value, reason in scan["rejects"]:
+            self.print_log(f"[ERROR] Error: [{value}] is not a valid IOC ({reason}). This IOC will be ignored.")
+        self.print_log(f"[INFO] {scan['read']} values read: {len(scan['new'])} new IOCs, {len(scan['existing'])} already on SentinelOne, "
+                       f"{scan['duplicates']} duplicates, {scan['rejected']} invalid. Asking for confirmation.")
+
+        if len(scan["new"]) + len(scan["existing"]) == 0:
+            ErrorDialogBox(self, title="Nothing to import", message=f"No valid IOC found in {os.path.basename(path)}.").show()
+            return
+
+        user_choice = ImportSummaryDialogBox(self, os.path.basename(path), scan).show()
+        if user_choice is None:
+            self.print_log("[INFO] Upload canceled. No IOC will be uploaded.")
+            return
+
+        iocs = scan["new"] + (scan["existing"] if user_choice == "update" else [])
+        self._start_upload([(ioc_value, ioc_type, get_retention_days(ioc_type)) for ioc_value, ioc_type in iocs])
 
     def onclick_upload_ioc(self):
         self.print_log("[INFO] Uploading the IOCs to SentinelOne.")
         self.print_log("[INFO] Opening the request body for S1 IOC upload.")
 
-        # IOC types to handle
+        # IOC lists to handle, every IOC already carries its type
         ioc_sources = [
-            ("IPV4", self.ip_list, config.ip_retention, "IP"),
-            ("DNS", self.domain_list, config.dns_retention, "domain"),
-            ("SHA1", self.hash_list, config.sha1_retention, "SHA1"),
-            ("URL", self.url_list, config.url_retention, "URL")
+            (self.ip_list, "IP"),
+            (self.domain_list, "domain"),
+            (self.hash_list, "hash"),
+            (self.url_list, "URL")
         ]
 
-        # each ioc list (if not empty) the values will be uploaded to S1.
-        for ioc_type, ioc_list, retention_days, label in ioc_sources:
-            if ioc_list != [""]:
-                for ioc_value in ioc_list:
-                    self.print_log(f"[INFO] Preparing to upload {label} [{ioc_value}]. Asking for confirmation.")
-        
-                    user_choice = YesNoDialogBox(self, title="S1 IOC Upload", message=f"Do you want to upload the {label} [{ioc_value}] to SentinelOne?")
-                    user_choice = user_choice.show()
-
-                    if user_choice:
-                        if self._check_ioc_presence(ioc_value):
-                            # True means that the IOC is new or the user want to refresh it
-                            self.print_log(f"[INFO] User confirmation received. Ready to upload {label} [{ioc_value}].")
-                            result = upload_ioc_to_s1(ioc_value, ioc_type, retention_days, self.title_field.get(), self.description_field.get())
-
-                            if result != None:
-                                if result.status_code == 200:
-                                    self.print_log(f"[SUCCESS] The {label} [{ioc_value}] has been successfully uploaded.")
-                                    InfoDialogBox(self, title="S1 IOC Uploaded", message=f"The {label} [{ioc_value}] has been successfully uploaded. Remember to update the main table!").show()
-                                else:
-                                    ErrorDialogBox(self, title="S1 IOC Not Uploaded", message=f"The {label} [{ioc_value}] could not be uploaded. Status code: {result.status_code}.").show()
-                                    self.print_log(f"[ERROR] The {label} [{ioc_value}] could not be uploaded. Status code: {result.status_code}.")
-                            else:
-                                ErrorDialogBox(self, title="S1 IOC Not Uploaded", message=f"The {label} [{ioc_value}] could not be uploaded. Exception raised while performing the upload.").show()
-                                self.print_log(f"[ERROR] The {label} [{ioc_value}] could not be uploaded. Exception raised while performing the upload.")
-                        else:
-                            self.print_log(f"[INFO] Upload canceled. {label.capitalize()} [{ioc_value}] will not be uploaded.")
-                        
-                    
-
-        
\ No newline at end of file
+        pending = [(ioc_value, ioc_type, get_retention_days(ioc_type)) for ioc_list, _ in ioc_sources for ioc_value, ioc_type in ioc_list]
+        if len(pending) == 0:
+            self.print_log("[WARNING] No IOC to upload.")
+            return
+
+        # A single confirmation for the whole batch
+        summary = ", ".join(f"{len(ioc_list)} {label}" for ioc_list, label in ioc_sources if len(ioc_list) > 0)
+        self.print_log(f"[INFO] Preparing to upload {len(pending)} IOCs ({summary}). Asking for confirmation.")
+
+        user_choice = YesNoDialogBox(self, title="S1 IOC Upload", message=f"Do you want to upload {len(pending)} IOCs ({summary}) to SentinelOne?")
+        user_choice = user_choice.show()
+
+        if not user_choice:
+            self.print_log(f"[INFO] Upload canceled. No IOC will be uploaded.")
+            return
+
+        self.print_log(f"[INFO] Checking if the {len(pending)} IOCs are already uploaded on SentinelOne.")
+        self._run_task("presence check", self._lookup_presence, [ioc[0] for ioc in pending],
+                       on_done=lambda found: self._upload_pending(pending, found))
+
+    def _upload_pending(self, pending, found):
+        if found is None:
+            self.print_log(f"[WARNING] Presence check cancelled. No IOC will be uploaded.")
+            return
+
+        existing = [found[ioc[0].lower()] for ioc in pending if ioc[0].lower() in found]
+        if len(existing) > 0:
+            self.print_log(f"[INFO] {len(existing)} IOCs are already uploaded on SentinelOne. Asking if an update is needed.")
+            user_choice = ExistingIOCReviewDialogBox(self, existing).show()
+
+            if user_choice is None:
+                self.print_log(f"[INFO] Upload canceled. No IOC will be uploaded.")
+                return
+            elif user_choice == "skip":
+                self.print_log(f"[INFO] User choose to not update the existing IOCs. Only the new ones will be uploaded.")
+                pending = [ioc for ioc in pending if ioc[0].lower() not in found]
+            else:
+                self.print_log(f"[INFO] User choose to update the existing IOCs. Moving on with the upload.")
+        else:
+            self.print_log(f"[INFO] All the IOCs are new. Moving on with the upload.")
+
+        if len(pending) == 0:
+            self.print_log(f"[INFO] Nothing left to upload.")
+            return
+
+        self._start_upload(pending)
+
+    def _start_upload(self, pending):
+        self.print_log(f"[INFO] User confirmation received. Ready to upload {len(pending)} IOCs.")
+        self._run_task("upload", lambda task: upload_iocs_to_s1(pending, self.title_field.get(), self.description_field.get(),
+                                                                on_progress=task.report_progress, cancel_event=task.cancel_event),
+                       on_done=self._on_upload_done,
+                       on_progress=lambda done, total: self.print_log(f"[INFO] Upload: {done}/{total} IOCs sent."))
+
+    def _on_upload_done(self, results):
+        failed = [result for result in results if not result["uploaded"]]
+        list_uploaded = len(results) - len(failed) <= MAX_LOGGED_RESULTS
+        for result in results:
+            if not result["uploaded"]:
+                self.print_log(f"[ERROR] The {result['type']} [{result['value']}] could not be uploaded. {result['error']}.")
+            elif list_uploaded:
+                self.print_log(f"[SUCCESS] The {result['type']} [{result['value']}] has been successfully uploaded.")
+        if not list_uploaded:
+            self.print_log(f"[SUCCESS] {len(results) - len(failed)} IOCs have been successfully uploaded.")
+
+        if len(failed) == 0:
+            InfoDialogBox(self, title="S1 IOC Uploaded", message=f"{len(results)} IOCs have been successfully uploaded. Remember to update the main table!").show()
+        else:
+            ErrorDialogBox(self, title="S1 IOC Not Uploaded", message=f"{len(failed)} of {len(results)} IOCs could not be uploaded. Check the log for details.").show()
@@ -1,16 +1,25 @@
-import csv
-
-import tkinter as tk
 import customtkinter as ctk
 
 from gui.viewer_table_frame import ViewerTableFrame
-from gui.uploader_app_window import UploaderAppWindow
-from gui.custom_messagebox import ErrorDialogBox, InfoDialogBox
+from gui.custom_messagebox import ErrorDialogBox, InfoDialogBox, YesNoDialogBox, DeleteFilterDialogBox
+from gui.task_runner import TaskRunner
 
-from data import get_s1_ioc, get_s1_filtered_ioc
+from data import sync_s1_ioc, export_iocs, delete_s1_iocs, get_db_ioc_values_by_filter
+from data.db_handler import FILTER_COLUMNS
 
+from config.config_loader import config
 from utils.log_handler import logger 
 
+log = logger.get_logger(__name__)
+
+EXPORT_FILE_TYPES = [
+    ("CSV", "*.csv"),
+    ("CSV gzip", "*.csv.gz"),
+    ("JSON lines", "*.jsonl"),
+    ("JSON lines gzip", "*.jsonl.gz"),
+    ("Parquet", "*.parquet")
+]
+
 ctk.set_default_color_theme("dark-blue")  # Optional theme enhancement
 ctk.set_appearance_mode("light")         # Adapts to user's light/dark mode
 
@@ -19,9 +28,18 @@ class ViewerAppWindow(ctk.CTk):
         super().__init__()
         self.title("S1 IOC Manager")
 
+        # Every network call runs in the background, results come back on the Tk thread
+        self.tasks = TaskRunner(self)
+        self.sync_task = None
+
+        # Delta sync every auto_refresh_seconds, 0 disables it
+        self.auto_refresh_ms = int(config.get("auto_refresh_seconds", 60) * 1000)
+        self.auto_refresh_id = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
         screen_width = self.winfo_screenwidth()
         screen_height = self.winfo_screenheight()
-        logger.print_log(f"[INFO] Generating the canvas. Screen size [{screen_width}x{screen_height}]")
+        log.info("Generating the canvas. Screen size [%sx%s]", screen_width, screen_height)
 
         self.geometry(f'{screen_width}x{screen_height}')
         self.maxsize(1800, 900)
@@ -36,9 +54,18 @@ class ViewerAppWindow(ctk.CTk):
         search_frame.grid_columnconfigure(0, weight=1)
         search_frame.grid_columnconfigure(1, weight=1)
 
-        # Left side: Upload button
-        self.upload_button = ctk.CTkButton(search_frame, text="Upload IOC 📝", width=200, command=self.upload_ioc)
-        self.upload_button.grid(row=0, column=0, sticky="w")
+        # Left side: Upload and delete buttons
+        left_frame = ctk.CTkFrame(search_frame, fg_color="transparent")
+        left_frame.grid(row=0, column=0, sticky="w")
+
+        self.upload_button = ctk.CTkButton(left_frame, text="Upload IOC 📝", width=200, command=self.upload_ioc)
+        self.upload_button.grid(row=0, column=0)
+
+        self.delete_selected_button = ctk.CTkButton(left_frame, text="Delete selected 🗑️", width=140, fg_color="red", hover_color="red3", command=self.delete_selected)
+        self.delete_selected_button.grid(row=0, column=1, padx=(10, 5))
+
+        self.delete_filter_button = ctk.CTkButton(left_frame, text="Delete by filter 🧹", width=140, fg_color="red", hover_color="red3", command=self.delete_by_filter)
+        self.delete_filter_button.grid(row=0, column=2, padx=5)
 
         # Right side: Search UI
         right_frame = ctk.CTkFrame(search_frame, fg_color="transparent")
@@ -47,15 +74,22 @@ class ViewerAppWindow(ctk.CTk):
         self.search_entry = ctk.CTkEntry(right_frame, placeholder_text="Filter Value", width=300)
         self.search_entry.grid(row=0, column=0, padx=5)
 
-        self.search_type = ctk.CTkOptionMenu(right_frame, values=["Value", "User", "Name", "Description", "Source"], width=130)
+        # Search as you type: the query runs once the user stops typing for search_delay_ms
+        self.search_delay_ms = config.get("search_delay_ms", 250)
+        self.search_after_id = None
+        self.search_entry.bind("<KeyRelease>", self._on_search_typed)
+        self.search_entry.bind("<Return>", lambda event: self.search_ioc())
+
+        self.search_type = ctk.CTkOptionMenu(right_frame, values=list(FILTER_COLUMNS), width=130, command=lambda choice: self.search_ioc())
         self.search_type.grid(row=0, column=1, padx=5)
 
         self.search_button = ctk.CTkButton(right_frame, text="Search 🔍", width=80, command=self.search_ioc)
         self.search_button.grid(row=0, column=2, padx=5)
 
         # --- Table Area ---
-        logger.print_log("[INFO] Preparing the first IOC table.")
-        self.table = ViewerTableFrame(self, get_s1_ioc())
+        # A single table lives as long as the window: searches and syncs only patch its rows
+        log.info("Preparing the first IOC table.")
+        self.table = ViewerTableFrame(self)
         self.table.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
 
         # --- Bottom Button Area ---
@@ -65,72 +99,223 @@ class ViewerAppWindow(ctk.CTk):
         bottom_frame.grid_columnconfigure(1, weight=0)  # Center button
         bottom_frame.grid_columnconfigure(2, weight=1)  # Right button
 
-        self.get_ioc_button = ctk.CTkButton(bottom_frame, text="Grab some fresh IOC ✊", command=self.show_table)
-        self.get_ioc_button.grid(row=0, column=1)
+        # Left side: background task status
+        status_frame = ctk.CTkFrame(bottom_frame, fg_color="transparent")
+        status_frame.grid(row=0, column=0, sticky="w")
 
-        self.extra_button = ctk.CTkButton(bottom_frame, text="Export 📤", width=80, command=self.export_data)
-        self.extra_button.grid(row=0, column=2, sticky="e", padx=(0, 5))
+        self.cancel_button = ctk.CTkButton(status_frame, text="Cancel ✋", width=80, command=self.cancel_tasks, state="disabled")
+        self.cancel_button.grid(row=0, column=0, padx=(5, 10))
 
-    def export_data(self):
-        logger.print_log("[INFO] Exporting current table.")
-        search_value = self.search_entry.get()
-        search_type = self.search_type.get()
+        self.status_label = ctk.CTkLabel(status_frame, text="", fg_color="transparent")
+        self.status_label.grid(row=0, column=1)
 
-        logger.print_log("[INFO] Checking if any filter is applied.")
-        if search_value != "":
-            logger.print_log("[INFO] Filter are applied. Getting the same set of IOC.")
-            ioc_dump = get_s1_filtered_ioc(search_value, search_type)
-        else:
-            logger.print_log("[INFO] Filter are not applied. Getting a fresh new set of IOC.")
-            ioc_dump = get_s1_ioc()
+        # Center: delta sync, and the full resync that also drops the IOCs deleted on the console
+        sync_frame = ctk.CTkFrame(bottom_frame, fg_color="transparent")
+        sync_frame.grid(row=0, column=1)
 
-        if len(ioc_dump) > 0:
-            logger.print_log("[INFO] Exporting the table to csv.")
-            keys = ioc_dump[0].keys()
+        self.get_ioc_button = ctk.CTkButton(sync_frame, text="Grab some fresh IOC ✊", command=self.show_table)
+        self.get_ioc_button.grid(row=0, column=0)
 
-            with open('./IOC_Manager_export.csv', 'w', newline='') as f:
-                writer = csv.DictWriter(f, keys)
-                writer.writeheader()
-                writer.writerows(ioc_dump)
-            
-            InfoDialogBox(self, title=f"Export completed", message=f"IOC_Manager_export.csv file created in the home folder.").show()
+        self.full_sync_button = ctk.CTkButton(sync_frame, text="Full resync 🔄", width=100, command=self.full_resync)
+        self.full_sync_button.grid(row=0, column=1, padx=(10, 0))
 
-            
-            logger.print_log("[INFO] IOC export completed.")
+        self.extra_button = ctk.CTkButton(bottom_frame, text="Export 📤", width=80, command=self.export_data)
+        self.extra_button.grid(row=0, column=2, sticky="e", padx=(0, 5))
 
-        else:
-            logger.print_log("[ERROR] Unable to retrieve a valid list of IOC. Cannot export them.")
-            ErrorDialogBox(self, title=f"Something went wrong", message=f"Unable to retrieve a valid list of IOC. Cannot export them.").show()
+        # The table above is already filled from the local DB. The first sync is only queued once
+        # the pending redraws are done, so the window paints before anything touches the network.
+        self.after_idle(lambda: self._start_sync("Syncing with SentinelOne..."))
 
+    def on_close(self):
+        if self.auto_refresh_id is not None:
+            self.after_cancel(self.auto_refresh_id)
+        self.tasks.shutdown()
+        self.destroy()
 
-    def show_table(self):
-        logger.print_log("[INFO] Updating the IOC table.")
+    def set_status(self, message, busy=None):
+        self.status_label.configure(text=message)
+        if busy is not None:
+            self.cancel_button.configure(state="normal" if busy else "disabled")
 
-        # Destroy old table
-        if self.table:
-            self.table.destroy()
+    def cancel_tasks(self):
+        self.tasks.cancel_all()
+        self.set_status("Cancelling...")
+
+    def export_data(self):
+        # Exports exactly what the table shows (same filter and order) from the local DB, no API call
+        from tkinter import filedialog
+
+        log.info("Exporting current table.")
+        path = filedialog.asksaveasfilename(parent=self, title="Export IOCs", initialfile="IOC_Manager_export.csv",
+                                            defaultextension=".csv", filetypes=EXPORT_FILE_TYPES)
+        if not path:
+            log.info("Export cancelled by the user.")
+            return
+
+        table = self.table
+        total = table.total
+        self.extra_button.configure(state="disabled")
+        self.set_status("Exporting the IOCs...", busy=True)
+        self.tasks.submit("export", lambda task: export_iocs(path, search_value=table.search_value, filter_type=table.filter_type,
+                                                             order_by=table.order_by, descending=table.descending,
+                                                             on_progress=task.report_progress, cancel_event=task.cancel_event),
+                          on_progress=lambda written: self.set_status(f"Exporting the IOCs... {written}/{total}"),
+                          on_done=lambda written: self._on_export_done(path, written),
+                          on_error=lambda e: self._on_export_done(path, None, e))
+
+    def _on_export_done(self, path, written, error=None):
+        self.extra_button.configure(state="normal")
+        self.set_status("", busy=False)
+
+        if error is not None:
+            log.error("Unable to export the IOCs to [%s]. %s", path, error)
+            ErrorDialogBox(self, title=f"Something went wrong", message=f"Unable to export the IOCs.\n{error}").show()
+        elif written is not None:
+            InfoDialogBox(self, title=f"Export completed", message=f"{written} IOCs exported to {path}.").show()
 
-        # Create and place new table using grid
-        self.table = ViewerTableFrame(self, get_s1_ioc())
-        self.table.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
+
+    def show_table(self):
+        log.info("Updating the IOC table.")
+
+        # The cached IOCs are shown first, then the table is reloaded every time a downloaded page is stored
+        self.search_entry.delete(0, "end")
+        self.table.set_query(None, self.search_type.get())
+
+        self._start_sync("Syncing with SentinelOne...")
+
+    def full_resync(self):
+        message = "Download every IOC again? The ones deleted on SentinelOne are removed once the download completes."
+        if not YesNoDialogBox(self, title="Full resync", message=message).show():
+            return
+        log.info("Full resync asked by the user.")
+        self._start_sync("Downloading every IOC from SentinelOne...", full_sync=True)
+
+    def _start_sync(self, status, full_sync=False):
+        # Only one sync at a time, the watermark makes it a delta pull after the first full one
+        if self.sync_task is not None:
+            return
+
+        if self.auto_refresh_id is not None:
+            self.after_cancel(self.auto_refresh_id)
+            self.auto_refresh_id = None
+
+        self.get_ioc_button.configure(state="disabled")
+        self.full_sync_button.configure(state="disabled")
+        self.set_status(status, busy=True)
+        self.sync_task = self.tasks.submit("sync", self._sync_job, full_sync,
+                                           on_progress=self._on_sync_page,
+                                           on_done=self._on_sync_done,
+                                           on_error=lambda e: self._on_sync_done(False))
+
+    def _auto_refresh(self):
+        self.auto_refresh_id = None
+        log.debug("Auto refresh: asking SentinelOne for the IOCs changed since the last sync.")
+        self._start_sync("Checking SentinelOne for changes...")
+
+    @staticmethod
+    def _sync_job(task, full_sync=False):
+        # Runs on a worker thread: every stored page is sent back to the Tk thread
+        return sync_s1_ioc(full_sync=full_sync, on_page=task.report_progress, cancel_event=task.cancel_event)
+
+    def _on_sync_page(self, stored):
+        # The table reads from the DB, reloading it also applies any active filter.
+        # Only the visible rows that actually changed are redrawn.
+        self.table.refresh()
+        self.set_status(f"Syncing with SentinelOne... {self.table.total} IOCs in the table.")
+
+    def _on_sync_done(self, success):
+        self.sync_task = None
+        self.get_ioc_button.configure(state="normal")
+        self.full_sync_button.configure(state="normal")
+        # A full resync may have pruned IOCs without storing any page
+        self.table.refresh()
+        self.set_status("" if success else "Sync failed or cancelled, showing the cached IOCs.", busy=False)
+
+        # The next delta sync is counted from the end of this one, so syncs never overlap
+        if self.auto_refresh_ms > 0:
+            self.auto_refresh_id = self.after(self.auto_refresh_ms, self._auto_refresh)
+
+    def _on_search_typed(self, event):
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+        self.search_after_id = self.after(self.search_delay_ms, self.search_ioc)
 
     def search_ioc(self):
-        search_value = self.search_entry.get()
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+            self.search_after_id = None
+
+        search_value = self.search_entry.get().strip()
         search_type = self.search_type.get()
+        if search_value == (self.table.search_value or "") and search_type == self.table.filter_type:
+            return
 
-        logger.print_log(f"[INFO] Updating the IOC table filtered for value: [{search_value}].")
+        log.debug("Updating the IOC table filtered for value: [%s].", search_value)
 
-        if search_value.strip() == "":
-            logger.print_log(f"[WARNING] User input not found, printing the full table again.")
-            self.show_table()
+        if search_value == "":
+            log.debug("User input not found, printing the full table again.")
+            self.table.set_query(None, search_type)
         else:
-            if self.table:
-                self.table.destroy()
-            self.table = ViewerTableFrame(self, get_s1_filtered_ioc(search_value, search_type))
-            self.table.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
+            self.table.set_query(search_value, search_type)
 
     
+    def delete_selected(self):
+        values = sorted(self.table.selected)
+        if len(values) == 0:
+            InfoDialogBox(self, title="Nothing selected", message="Select the IOCs to delete first (Ctrl + click or Shift + click).").show()
+            return
+        self._bulk_delete(values)
+
+    def delete_by_filter(self):
+        criteria = DeleteFilterDialogBox(self, self.table.search_value, self.table.filter_type).show()
+        if criteria is None:
+            return
+
+        # The filter is resolved on the local DB, then every value is deleted on S1
+        values = get_db_ioc_values_by_filter(**criteria)
+        if len(values) == 0:
+            InfoDialogBox(self, title="Nothing to delete", message="No IOC matches the filter.").show()
+            return
+        self._bulk_delete(values)
+
+    def _bulk_delete(self, values):
+        preview = ", ".join(values[:3]) + (", ..." if len(values) > 3 else "")
+        log.info("User want to delete %s IOCs. Asking for confirmation.", len(values))
+        user_choice = YesNoDialogBox(self, title="Are you sure?", message=f"Do you want to delete {len(values)} IOCs ({preview}) from SentinelOne?").show()
+        if not user_choice:
+            log.info("User don't want to delete the %s IOCs. Moving on.", len(values))
+            return
+
+        self.delete_selected_button.configure(state="disabled")
+        self.delete_filter_button.configure(state="disabled")
+        self.set_status(f"Deleting {len(values)} IOCs...", busy=True)
+        self.tasks.submit("bulk delete", lambda task: delete_s1_iocs(values, on_progress=task.report_progress, cancel_event=task.cancel_event),
+                          on_progress=lambda done, total: self.set_status(f"Deleting IOCs... {done}/{total}"),
+                          on_done=self._on_bulk_delete_done,
+                          on_error=lambda e: self._on_bulk_delete_done(None))
+
+    def _on_bulk_delete_done(self, results):
+        self.delete_selected_button.configure(state="normal")
+        self.delete_filter_button.configure(state="normal")
+        self.set_status("", busy=False)
+
+        if results is None:
+            ErrorDialogBox(self, title="IOCs not deleted", message="The bulk deletion failed. Check the log for details.").show()
+            return
+
+        deleted = [result["value"] for result in results if result["deleted"]]
+        self.table.selected.difference_update(deleted)
+        self.table.refresh()
+
+        if len(deleted) == len(results):
+            InfoDialogBox(self, title="IOCs deleted", message=f"{len(deleted)} IOCs have been successfully deleted.").show()
+        else:
+            ErrorDialogBox(self, title="IOCs not deleted", message=f"{len(results) - len(deleted)} IOCs have NOT been deleted. Check the log for details.").show()
+
     def upload_ioc(self):
-        logger.print_log("[INFO] S1_IOC_Uploader v.2")
+        # The uploader (and its validation dependencies) is loaded the first time it is opened
+        from gui.uploader_app_window import UploaderAppWindow
+
+        log.info("S1_IOC_Uploader v.2")
         uploader_window = UploaderAppWindow(self)
         uploader_window.show()
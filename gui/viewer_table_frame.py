@@ -1,15 +1,16 @@
 import tkinter as tk
 from tkinter import ttk
 import customtkinter as ctk
-from dateutil import parser
-from datetime import datetime
 import json
 
 from utils.log_handler import logger
+from utils.time_handler import format_timestamp
 
 from gui.custom_messagebox import YesNoDialogBox, InfoDialogBox, ErrorDialogBox
 
-from data import get_s1_ioc_by_value, delete_s1_ioc_by_value
+from data import get_ioc_detail, refresh_ioc_detail, delete_s1_ioc_by_value, count_db_ioc, get_db_ioc_window
+
+log = logger.get_logger(__name__)
 
 colums_settings = {
     'num': {'allignment': tk.CENTER, 'size': 60},
@@ -27,10 +28,11 @@ colums_settings = {
 class ItemWindow(ctk.CTkToplevel):
     def __init__(self, parent, value, data):
         super().__init__(parent)
+        self.tasks = parent.winfo_toplevel().tasks
         self.title(f"Item #{value[0]} [{value[4]}]")
         self.geometry(f"500x450")
         
-        logger.print_log(f"[INFO] Showing full IOC for element number [{value[0]}].")
+        log.info("Showing full IOC for element number [%s].", value[0])
 
         self.title_label = ctk.CTkLabel(self, text=f"Showing the full json for the element number {value[0]}", fg_color="transparent")
         self.title_label.pack(side=tk.TOP, fill="both", padx=5)
@@ -38,12 +40,24 @@ class ItemWindow(ctk.CTkToplevel):
         self.json_box = ctk.CTkTextbox(self, state="disabled", text_color="black", font=("Consolas", 10), fg_color="light grey")
         self.json_box.pack(side=tk.TOP, expand=True, fill="both", padx=10, pady=10)
 
+        self.get_ioc_button = ctk.CTkButton(self, text="Delete IOC 🗑️", fg_color="red", hover_color="red3", command=lambda: (self._delete_ioc(self.data)))
+        self.get_ioc_button.pack(side=ctk.BOTTOM, pady=10)
+
+        self.set_data(data)
+
+    def set_data(self, data, status=None):
+        # Called again when a background refresh from S1 brings a newer payload
+        if not self.winfo_exists():
+            return
+
+        self.data = data
         self.json_box.configure(state="normal") # Temporarily enable
+        self.json_box.delete("1.0", "end")
         self.json_box.insert("end", text=f"{data}")
         self.json_box.configure(state="disabled")
 
-        self.get_ioc_button = ctk.CTkButton(self, text="Delete IOC 🗑️", fg_color="red", hover_color="red3", command=lambda: (self._delete_ioc(data)))
-        self.get_ioc_button.pack(side=ctk.BOTTOM, pady=10)
+        if status is not None:
+            self.title_label.configure(text=status)
 
 
     def show(self):
@@ -51,44 +65,82 @@ class ItemWindow(ctk.CTkToplevel):
 
     def _delete_ioc(self, data):
         data = json.loads(data)
-        logger.print_log(f"[INFO] User want to delete IOC with value: [{data['value']}]. Asking for confirmation.")
+        log.info("User want to delete IOC with value: [%s]. Asking for confirmation.", data['value'])
 
         user_choice = YesNoDialogBox(self, title="Are you sure?", message=f"Do you want to delete the IOC with value: [{data['value']}] from SentinelOne?")
         user_choice = user_choice.show()
 
         if user_choice:
-            logger.print_log(f"[INFO] User want to delete IOC with value: [{data['value']}].")
+            log.info("User want to delete IOC with value: [%s].", data['value'])
 
-            result = delete_s1_ioc_by_value(data['value'])
+            self.get_ioc_button.configure(state="disabled", text="Deleting...")
+            self.tasks.submit("delete", lambda task: delete_s1_ioc_by_value(data['value']),
+                              on_done=lambda result: self._on_deleted(data, result),
+                              on_error=lambda e: self._on_deleted(data, False))
+        else:
+            log.info("User don't want to delete IOC with value: [%s]. Moving on.", data['value'])
 
-            if result:
-                InfoDialogBox(self, title = "IOC deleted", message=f"The IOC [{data['value']}] has been successfully deleted.\nRemember to refresh the table!").show()
-                self.destroy()
-            else:
-                ErrorDialogBox(self, title="IOC deleted", message=f"The IOC [{data['value']}] has NOT been successfully deleted.").show()
+    def _on_deleted(self, data, result):
+        if not self.winfo_exists():
+            return
+
+        if result:
+            InfoDialogBox(self, title = "IOC deleted", message=f"The IOC [{data['value']}] has been successfully deleted.\nRemember to refresh the table!").show()
+            self.destroy()
         else:
-            logger.print_log(f"[INFO] User don't want to delete IOC with value: [{data['value']}]. Moving on.")
+            self.get_ioc_button.configure(state="normal", text="Delete IOC 🗑️")
+            ErrorDialogBox(self, title="IOC deleted", message=f"The IOC [{data['value']}] has NOT been successfully deleted.").show()
 
 class ViewerTableFrame(tk.Frame):
-    def __init__(self, parent, data):
+    # Virtual table: the Treeview only holds the rows currently on screen. The rows come from the
+    # local DB one window at a time (visible rows plus a buffer on both sides), so building,
+    # scrolling and searching cost the same whatever the number of IOCs.
+
+    BUFFER_ROWS = 100  # Rows kept in memory above and below the visible ones
+
+    def __init__(self, parent, search_value=None, filter_type="Value"):
         super().__init__(parent)
         self.tree = None
-        self.sort_state = {}   # Track sort order for each column
+        self.vsb = None
         self.original_headings = {}  # Keep original column names
-        self.build_table(data)
+
+        self.search_value = search_value
+        self.filter_type = filter_type
+        self.order_by = "num"
+        self.descending = False
+
+        self.total = 0            # Rows matching the current query
+        self.offset = 0           # Index of the first visible row
+        self.visible_rows = 1     # Rows fitting in the widget, updated on resize
+        self.window_start = 0     # Index of the first buffered row
+        self.window = []          # Buffered rows
+        self.rendered = []        # Values of the rows currently in the Treeview
+        self.selected = set()     # Values of the selected IOCs, kept while the rows scroll out of view
+
+        self.build_table()
 
         # Let this frame expand with its parent
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
-    def build_table(self, data):
-        logger.print_log("[INFO] Building the IOC table.")
+        self.refresh()
+
+    @staticmethod
+    def _format_row(row):
+        # Timestamps are stored as epoch seconds and only formatted for the rows on screen
+        row['creationTime'] = format_timestamp(row.get('creationTime'))
+        row['updatedAt']    = format_timestamp(row.get('updatedAt'))
+        row['validUntil']   = format_timestamp(row.get('validUntil'))
+        return [row.get(col, "") for col in colums_settings]
 
-        # Create Treeview
-        self.tree = ttk.Treeview(self, columns=list(data[0].keys()), show="headings")
+    def build_table(self):
+        log.info("Building the IOC table.")
+
+        # Create Treeview. Columns come from the settings, rows are loaded by _render
+        self.tree = ttk.Treeview(self, columns=list(colums_settings.keys()), show="headings", selectmode="extended")
 
         # Configure columns and headings
-        for col in data[0].keys():
+        for col in colums_settings:
             heading = col
             self.original_headings[col] = heading  # store original name
             alignment = colums_settings[col].get("allignment", tk.CENTER)
@@ -100,55 +152,123 @@ class ViewerTableFrame(tk.Frame):
             self.tree.heading(col, text=heading, command=lambda c=col: self.sort_column(c, False))
             self.tree.column(col, anchor=alignment, stretch=stretch, width=width if width else 100)
 
-        # Insert rows
-        for row in data:
-            row['creationTime'] = parser.parse(row['creationTime']).strftime("%d/%m/%Y %H:%M:%S") if row.get('creationTime') else ""
-            row['updatedAt']    = parser.parse(row['updatedAt']).strftime("%d/%m/%Y %H:%M:%S")    if row.get('updatedAt') else ""
-            row['validUntil']   = parser.parse(row['validUntil']).strftime("%d/%m/%Y %H:%M:%S")   if row.get('validUntil') else ""
-            self.tree.insert("", "end", values=list(row.values()))
-
-        # Create scrollbars
-        vsb = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        # Create scrollbars. The vertical one drives the virtual offset, not the Treeview
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
         hsb = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
 
         # Attach scrollbars to tree
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.tree.configure(xscrollcommand=hsb.set)
 
         # Layout with grid
         self.tree.grid(row=0, column=0, sticky="nsew")
-        vsb.grid(row=0, column=1, sticky="ns")
+        self.vsb.grid(row=0, column=1, sticky="ns")
         hsb.grid(row=1, column=0, sticky="ew")
 
         # Make frame expandable
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
-        # Bind double click
+        # Bind double click, resize and scrolling
         self.tree.bind("<Double-1>", self.row_double_click)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self._scroll_to(self.offset - 3) or "break")
+        self.tree.bind("<Button-5>", lambda event: self._scroll_to(self.offset + 3) or "break")
+        self.tree.bind("<Prior>", lambda event: self._scroll_to(self.offset - self.visible_rows) or "break")
+        self.tree.bind("<Next>", lambda event: self._scroll_to(self.offset + self.visible_rows) or "break")
+
+    def set_query(self, search_value, filter_type):
+        # New search on the same Treeview: back to the first row, the items are patched in place
+        self.search_value = search_value or None
+        self.filter_type = filter_type
+        self.offset = 0
+        self.selected.clear()
+        self.refresh()
+
+    def refresh(self):
+        # Reloads the current window from the DB, e.g. after a sync stored new rows
+        self.total = count_db_ioc(self.search_value, self.filter_type)
+        self.window = []
+        self._scroll_to(self.offset)
+
+    def _scroll_to(self, offset):
+        self.offset = max(0, min(offset, self.total - self.visible_rows))
+        self._render()
+
+    def _render(self):
+        # Load a new buffered window only when the visible rows are not all in the current one
+        window_end = self.window_start + len(self.window)
+        visible_end = min(self.offset + self.visible_rows, self.total)
+        if self.offset < self.window_start or visible_end > window_end:
+            self.window_start = max(0, self.offset - self.BUFFER_ROWS)
+            self.window = get_db_ioc_window(self.window_start, self.visible_rows + 2 * self.BUFFER_ROWS,
+                                            self.search_value, self.filter_type, self.order_by, self.descending)
+
+        first = self.offset - self.window_start
+        values = [self._format_row(dict(row)) for row in self.window[first:first + self.visible_rows]]
+
+        if self.total == 0:
+            values = [["", "No IOC found"] + [""] * (len(colums_settings) - 2)]
+
+        # Patch the Treeview in place: only the rows whose values changed are touched,
+        # so a refresh after a small delta sync does not redraw the whole table
+        items = self.tree.get_children()
+        for index, row_values in enumerate(values):
+            if index >= len(items):
+                self.tree.insert("", "end", values=row_values)
+            elif index >= len(self.rendered) or self.rendered[index] != row_values:
+                self.tree.item(items[index], values=row_values)
+        if len(items) > len(values):
+            self.tree.delete(*items[len(values):])
+        self.rendered = values
+
+        # Treeview items are reused for other IOCs while scrolling, the selection follows the values
+        items = self.tree.get_children()
+        self.tree.selection_set([item for item, row_values in zip(items, values) if row_values[4] in self.selected])
+
+        # Scrollbar position as fractions of the whole result
+        if self.total > 0:
+            self.vsb.set(self.offset / self.total, min(1.0, (self.offset + self.visible_rows) / self.total))
+        else:
+            self.vsb.set(0, 1)
+
+    def _on_select(self, event):
+        selection = set(self.tree.selection())
+        for item, row_values in zip(self.tree.get_children(), self.rendered):
+            if row_values[4] == "":
+                continue
+            if item in selection:
+                self.selected.add(row_values[4])
+            else:
+                self.selected.discard(row_values[4])
+
+    def _on_resize(self, event):
+        rowheight = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible_rows = max(1, event.height // rowheight - 1)  # One row worth of space for the headings
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self._scroll_to(self.offset)
+
+    def _on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self._scroll_to(int(float(args[0]) * self.total))
+        elif action == "scroll":
+            step = int(args[0]) * (self.visible_rows if args[1] == "pages" else 1)
+            self._scroll_to(self.offset + step)
+
+    def _on_mousewheel(self, event):
+        # Windows reports multiples of 120, macOS small deltas
+        step = -event.delta // 120 if abs(event.delta) >= 120 else -event.delta
+        self._scroll_to(self.offset + step * 3)
+        return "break"
 
     def sort_column(self, col, reverse):
-        """Sort a column and update header indicator."""
-        items = [(self.tree.set(k, col), k) for k in self.tree.get_children('')]
-
-        def try_parse(val):
-            """Try to parse into int, float, datetime, else string."""
-            from datetime import datetime
-            for parse_fn in (int, float):
-                try:
-                    return parse_fn(val)
-                except Exception:
-                    pass
-            try:
-                return datetime.strptime(val, "%d/%m/%Y %H:%M:%S")
-            except Exception:
-                return val.lower()  # fallback to string
-
-        # Sort
-        items.sort(key=lambda t: try_parse(t[0]), reverse=reverse)
-
-        # Reorder
-        for index, (_, k) in enumerate(items):
-            self.tree.move(k, '', index)
+        """Sort a column in the DB and update header indicator."""
+        self.order_by = col
+        self.descending = reverse
+        self.offset = 0
+        self.refresh()
 
         # Reset all headers
         for c in self.original_headings:
@@ -160,21 +280,46 @@ class ViewerTableFrame(tk.Frame):
         self.tree.heading(col, text=f"{self.original_headings[col]} {arrow}",
                           command=lambda: self.sort_column(col, not reverse))
 
-        # Save state
-        self.sort_state[col] = not reverse
-
     def row_double_click(self, event):        
         item_id = self.tree.identify_row(event.y)
         if item_id:
             value = self.tree.item(item_id, "values")
-            logger.print_log(f"[INFO] Double click on item [{value[0]}] detected. Showing detailed pop up window.")
+            if value[4] == "":
+                return
+            log.info("Double click on item [%s] detected. Showing detailed pop up window.", value[0])
+
+            # The payload stored by the last sync opens the window right away, S1 is only asked
+            # when the local copy is missing or older than the detail cache TTL
+            ioc_data, fresh = get_ioc_detail(value[4])
+            if ioc_data is None:
+                self.winfo_toplevel().tasks.submit("lookup", lambda task: refresh_ioc_detail(value[4]),
+                                                   on_done=lambda ioc_data: self._show_item(value, ioc_data))
+                return
+
+            item_window = ItemWindow(self, value=value, data=json.dumps(ioc_data, indent=2))
+            if not fresh:
+                log.info("Local copy of IOC [%s] is stale. Refreshing it from SentinelOne.", value[4])
+                item_window.title_label.configure(text=f"Showing the local copy of the element number {value[0]}, refreshing it from SentinelOne...")
+                self.winfo_toplevel().tasks.submit("refresh detail", lambda task: refresh_ioc_detail(value[4]),
+                                                   on_done=lambda ioc_data: self._on_item_refreshed(item_window, value, ioc_data),
+                                                   on_error=lambda e: self._on_item_refreshed(item_window, value, None))
+            item_window.show()
+
+    @staticmethod
+    def _on_item_refreshed(item_window, value, ioc_data):
+        if not item_window.winfo_exists():
+            return
+        if ioc_data is None:
+            item_window.title_label.configure(text=f"Showing the local copy of the element number {value[0]}, it could not be refreshed from SentinelOne.")
+        else:
+            item_window.set_data(json.dumps(ioc_data, indent=2), f"Showing the full json for the element number {value[0]}")
 
-            ioc_data = get_s1_ioc_by_value(value[4])            
-            if ioc_data is not None:
-                ioc_data = json.dumps(ioc_data, indent=2)
-                item_window = ItemWindow(self, value=value, data=ioc_data)
-                item_window.show()
-            else:
-                logger.print_log(f"[WARNING] IOC at row number [{value[0]}] Not found on the console, maybe a table refresh is needed.")
-                ErrorDialogBox(self, title="IOC not found",
-                               message=f"IOC at row number {value[0]} not found on the console, maybe a table refresh is needed?").show()
+    def _show_item(self, value, ioc_data):
+        if ioc_data is not None:
+            ioc_data = json.dumps(ioc_data, indent=2)
+            item_window = ItemWindow(self, value=value, data=ioc_data)
+            item_window.show()
+        else:
+            log.warning("IOC at row number [%s] Not found on the console, maybe a table refresh is needed.", value[0])
+            ErrorDialogBox(self, title="IOC not found",
+                           message=f"IOC at row number {value[0]} not found on the console, maybe a table refresh is needed?").show()
@@ -0,0 +1,518 @@
+import argparse, base64, hashlib, json, os, random, re, sys, threading, time, urllib.error, urllib.parse, urllib.request, uuid
+
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Offline stand-in for the threat-intelligence/iocs endpoints of the SentinelOne API, to run the tool,
+# benchmarks and regression tests without a tenant. Standard library only.
+#   python tools/s1_mock_server.py serve [--iocs 100000] [--latency 50 --jitter 20] [--throttle-rate 0.05] [--max-rps 20]
+#   python tools/s1_mock_server.py serve --replay fixtures/
+#   python tools/s1_mock_server.py record --upstream https://euce1-777.sentinelone.net/web/api/v2.1/ --out fixtures/
+# Point s1_api in config.yml to the printed URL. Any API token is accepted unless --token is given.
+# serve:  GET (cursor pagination, updatedAt__gt, value and value__in filters), POST (upsert by value and type)
+#         and DELETE (filter by value) on a synthetic dataset. The IOCs are built from their position on
+#         demand, so a million of them costs no memory until they are created or deleted.
+#         --replay answers with recorded fixtures instead.
+# record: proxy towards a real tenant saving every exchange to a fixture file, without the API token.
+# Latency and 429 injection apply to both serve modes. GET /mock/stats returns the request counters.
+
+API_PREFIX = "/web/api/v2.1/"
+IOC_ENDPOINT = "threat-intelligence/iocs"
+STATS_PATH = "/mock/stats"
+
+MAX_PAGE_SIZE = 1000
+# The synthetic IPv4 addresses are 10.x.y.z, so the position must fit in 24 bits
+MAX_SYNTHETIC_IOCS = 1 << 24
+
+# Synthetic IOCs cycle over these types and sources. Updated one second apart from BASE_TIME, in position order.
+SYNTHETIC_TYPES = ("IPV4", "DNS", "URL", "SHA256", "SHA1", "MD5")
+SYNTHETIC_SOURCES = ("Manual Upload", "Feed A", "Feed B")
+HASH_LENGTHS = {"SHA256": 64, "SHA1": 40, "MD5": 32}
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+NAIVE_EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+BASE_US = (BASE_TIME - EPOCH) // MICROSECOND
+SYNTHETIC_STEP_US = 1000000
+
+SYNTHETIC_IPV4_PATTERN = re.compile(r"10\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})")
+SYNTHETIC_HOST_PATTERN = re.compile(r"(?:http://)?ioc-(\d+)\.example\.(?:com|net)(?:/payload)?")
+HEX_PATTERN = re.compile(r"[0-9a-f]+")
+
+def format_time(us):
+    # isoformat is several times faster than strftime, it matters when building pages of synthetic IOCs
+    return (NAIVE_EPOCH + us * MICROSECOND).isoformat(timespec="microseconds") + "Z"
+
+def parse_time(value):
+    # ISO 8601 as sent by S1 or by the tool, microseconds since the epoch. Raises ValueError.
+    parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00").replace(" ", "T"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return (parsed - EPOCH) // MICROSECOND
+
+def now_us():
+    return (datetime.now(timezone.utc) - EPOCH) // MICROSECOND
+
+def encode_cursor(position):
+    # Opaque like the S1 cursors
+    return base64.urlsafe_b64encode(f"position:{position}".encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode().split(":", 1)[1])
+    except (ValueError, IndexError, UnicodeError):
+        raise ValueError(f"Invalid cursor [{cursor}]")
+
+def synthetic_value(i):
+    ioc_type = SYNTHETIC_TYPES[i % len(SYNTHETIC_TYPES)]
+    if ioc_type == "IPV4":
+        return ioc_type, f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+    if ioc_type == "DNS":
+        return ioc_type, f"ioc-{i}.example.com"
+    if ioc_type == "URL":
+        return ioc_type, f"http://ioc-{i}.example.net/payload"
+    # The last 8 hex digits are the position, so a hash can be looked up without an index
+    length = HASH_LENGTHS[ioc_type]
+    return ioc_type, hashlib.sha256(str(i).encode()).hexdigest()[:length - 8] + f"{i:08x}"
+
+def synthetic_position(value):
+    # Position of a synthetic value, None when the value is not one of them
+    if match := SYNTHETIC_IPV4_PATTERN.fullmatch(value):
+        a, b, c = (int(group) for group in match.groups())
+        i = a << 16 | b << 8 | c
+    elif match := SYNTHETIC_HOST_PATTERN.fullmatch(value):
+        i = int(match.group(1))
+    elif len(value) in (32, 40, 64) and HEX_PATTERN.fullmatch(value):
+        i = int(value[-8:], 16)
+    else:
+        return None
+    return i if synthetic_value(i)[1] == value else None
+
+def synthetic_ioc(i, account_id):
+    ioc_type, value = synthetic_value(i)
+    updated = format_time(BASE_US + i * SYNTHETIC_STEP_US)
+    return {
+        "uuid": str(uuid.UUID(int=i)),
+        "name": f"Synthetic IOC {i}",
+        "description": f"Synthetic {ioc_type} number {i}",
+        "type": ioc_type,
+        "value": value,
+        "metadata": "mock@example.com",
+        "creator": "mock@example.com",
+        "source": SYNTHETIC_SOURCES[i % len(SYNTHETIC_SOURCES)],
+        "method": "EQUALS",
+        "originalRiskScore": 50 + i % 51,
+        "creationTime": updated,
+        "updatedAt": updated,
+        "validUntil": format_time(BASE_US + i * SYNTHETIC_STEP_US + 3650 * 86400 * SYNTHETIC_STEP_US),
+        "accountId": account_id,
+        "scope": "account"
+    }
+
+class ApiError(Exception):
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+class SyntheticStore:
+    # IOC list of the mock. Positions below count are the synthetic IOCs, built on demand; the IOCs
+    # created by POST are appended after them with increasing updatedAt, so position order is also
+    # updatedAt order and updatedAt__gt is a bisection. An upsert deletes the old position and appends.
+
+    def __init__(self, count, account_id="0"):
+        if not 0 <= count <= MAX_SYNTHETIC_IOCS:
+            raise ValueError(f"The synthetic dataset holds at most {MAX_SYNTHETIC_IOCS} IOCs")
+        self.count = count
+        self.account_id = account_id
+        self.deleted = set()
+        self.created = []
+        self.created_us = []
+        self.created_index = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.count + len(self.created)
+
+    def _ioc_at(self, position):
+        if position < self.count:
+            return synthetic_ioc(position, self.account_id)
+        return self.created[position - self.count]
+
+    def _updated_us(self, position):
+        if position < self.count:
+            return BASE_US + position * SYNTHETIC_STEP_US
+        return self.created_us[position - self.count]
+
+    def _first_after(self, after_us):
+        # First position updated strictly after after_us
+        if after_us is None:
+            return 0
+        delta = after_us - BASE_US
+        position = delta // SYNTHETIC_STEP_US + 1 if delta >= 0 else 0
+        if position < self.count:
+            return position
+        return self.count + bisect_right(self.created_us, after_us)
+
+    def _find(self, value):
+        value = value.strip().lower()
+        positions = list(self.created_index.get(value, ()))
+        position = synthetic_position(value)
+        if position is not None and position < self.count:
+            positions.append(position)
+        return [position for position in positions if position not in self.deleted]
+
+    def _matching(self, params):
+        # Positions selected by the value filters, None when the request has none
+        values = params.get("value__in") or params.get("value")
+        if values is None:
+            return None
+        positions = sorted({position for value in values.split(",") for position in self._find(value)})
+        after_us = parse_time(params["updatedAt__gt"]) if "updatedAt__gt" in params else None
+        return [position for position in positions if after_us is None or self._updated_us(position) > after_us]
+
+    def list(self, params):
+        try:
+            limit = min(max(int(params.get("limit", MAX_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+            start = decode_cursor(params["cursor"]) if params.get("cursor") else None
+            after_us = parse_time(params["updatedAt__gt"]) if "updatedAt__gt" in params else None
+        except ValueError as e:
+            raise ApiError(400, str(e))
+
+        with self.lock:
+            matching = self._matching(params)
+            if matching is not None:
+                offset = start or 0
+                page = [self._ioc_at(position) for position in matching[offset:offset + limit]]
+                next_cursor = encode_cursor(offset + limit) if offset + limit < len(matching) else None
+                return {"data": page, "pagination": {"nextCursor": next_cursor, "totalItems": len(matching)}}
+
+            first = self._first_after(after_us)
+            position = max(first, start or 0)
+            end = len(self)
+            page = []
+            while len(page) < limit and position < end:
+                if position not in self.deleted:
+                    page.append(self._ioc_at(position))
+                position += 1
+            total = end - first - sum(1 for deleted in self.deleted if deleted >= first)
+            next_cursor = encode_cursor(position) if position < end else None
+            return {"data": page, "pagination": {"nextCursor": next_cursor, "totalItems": total}}
+
+    def create(self, body):
+        items = body.get("data") if isinstance(body, dict) else None
+        if not isinstance(items, list):
+            raise ApiError(400, "The body must hold a data list")
+        for item in items:
+            if not isinstance(item, dict) or not item.get("value") or not item.get("type"):
+                raise ApiError(400, "Every IOC needs a value and a type")
+
+        account_id = ((body.get("filter") or {}).get("accountIds") or [self.account_id])[0]
+        created = []
+        with self.lock:
+            for item in items:
+                # Same value and type: the old IOC is replaced, like an update on the console
+                value = item["value"].strip()
+                for position in self._find(value):
+                    if self._ioc_at(position)["type"] == item["type"]:
+                        self.deleted.add(position)
+
+                updated_us = max(now_us(), self.created_us[-1] + 1 if self.created_us else 0)
+                ioc = {**item, "value": value, "uuid": str(uuid.uuid4()), "accountId": account_id, "scope": "account", "updatedAt": format_time(updated_us)}
+                for field in ("creationTime", "validUntil"):
+                    try:
+                        ioc[field] = format_time(parse_time(str(item[field])))
+                    except (KeyError, ValueError):
+                        ioc[field] = format_time(updated_us)
+
+                self.created_index.setdefault(value.lower(), []).append(len(self))
+                self.created.append(ioc)
+                self.created_us.append(updated_us)
+                created.append(ioc)
+        return {"data": created}
+
+    def delete(self, body):
+        filters = body.get("filter") if isinstance(body, dict) else None
+        values = (filters or {}).get("value__in") or (filters or {}).get("value")
+        if not values:
+            raise ApiError(400, "A value or value__in filter is required")
+        if isinstance(values, str):
+            values = values.split(",")
+
+        with self.lock:
+            positions = {position for value in values for position in self._find(value)}
+            self.deleted.update(positions)
+        return {"data": {"affected": len(positions)}}
+
+def fixture_key(method, endpoint, query, body):
+    # Requests are matched on method, endpoint, query parameters and JSON body, all order independent
+    return json.dumps([method, endpoint, sorted(urllib.parse.parse_qsl(query)), body], sort_keys=True)
+
+class FixtureStore:
+    # Answers with recorded exchanges. The same request recorded more than once is answered in
+    # recording order, then the last answer is repeated (a sync recorded twice sees both states).
+
+    def __init__(self, path):
+        self.answers = {}
+        self.served = {}
+        self.lock = threading.Lock()
+        for file_name in sorted(os.listdir(path)):
+            if file_name.endswith(".json"):
+                with open(os.path.join(path, file_name), encoding="utf-8") as f:
+                    fixture = json.load(f)
+                key = fixture_key(fixture["method"], fixture["endpoint"], fixture["query"], fixture["body"])
+                self.answers.setdefault(key, []).append(fixture)
+        if not self.answers:
+            raise ValueError(f"No fixture found in [{path}]")
+
+    def __len__(self):
+        return sum(len(answers) for answers in self.answers.values())
+
+    def answer(self, method, endpoint, query, body):
+        key = fixture_key(method, endpoint, query, body)
+        with self.lock:
+            answers = self.answers.get(key)
+            if answers is None:
+                raise ApiError(404, f"No fixture recorded for {method} {endpoint}?{query}")
+            served = self.served.get(key, 0)
+            self.served[key] = served + 1
+        fixture = answers[min(served, len(answers) - 1)]
+        return fixture["status"], fixture["response"], fixture.get("headers", {})
+
+class Recorder:
+    # Forwards every request to the real tenant with the caller's API token and saves the exchange
+    # (never the token) as <n>_<method>.json in the fixture folder.
+
+    def __init__(self, upstream, path):
+        self.upstream = upstream if upstream.endswith("/") else upstream + "/"
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self.counter = len([file_name for file_name in os.listdir(path) if file_name.endswith(".json")])
+
+    def answer(self, method, endpoint, query, body, headers):
+        url = self.upstream + endpoint + (f"?{query}" if query else "")
+        data = json.dumps(body).encode() if body is not None else None
+        forwarded = {"Content-Type": "application/json"}
+        if headers.get("Authorization"):
+            forwarded["Authorization"] = headers["Authorization"]
+        request = urllib.request.Request(url, data=data, method=method, headers=forwarded)
+
+        try:
+            with urllib.request.urlopen(request, timeout=120) as res:
+                status, raw, answer_headers = res.status, res.read(), res.headers
+        except urllib.error.HTTPError as e:
+            status, raw, answer_headers = e.code, e.read(), e.headers
+        except urllib.error.URLError as e:
+            raise ApiError(502, f"Upstream not reachable: {e.reason}")
+
+        try:
+            response = json.loads(raw) if raw else None
+        except ValueError:
+            response = raw.decode("utf-8", "replace")
+        kept_headers = {name: answer_headers[name] for name in ("Retry-After",) if answer_headers.get(name)}
+
+        with self.lock:
+            self.counter += 1
+            file_name = os.path.join(self.path, f"{self.counter:06d}_{method}.json")
+        with open(file_name, "w", encoding="utf-8") as f:
+            json.dump({"method": method, "endpoint": endpoint, "query": query, "body": body,
+                       "status": status, "response": response, "headers": kept_headers}, f)
+        return status, response, kept_headers
+
+class Faults:
+    # Latency and rate limiting injected before every API request. Seeded, so a run can be repeated.
+
+    def __init__(self, latency=0, jitter=0, throttle_rate=0, max_rps=0, retry_after=1, seed=0):
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.tokens = max_rps
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0
+        return max(self.latency + jitter, 0)
+
+    def throttled(self):
+        # True when this request must be answered with a 429
+        with self.lock:
+            if self.throttle_rate and self.random.random() < self.throttle_rate:
+                return True
+            if self.max_rps:
+                now = time.monotonic()
+                self.tokens = min(self.max_rps, self.tokens + (now - self.updated) * self.max_rps)
+                self.updated = now
+                if self.tokens < 1:
+                    return True
+                self.tokens -= 1
+        return False
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, backend, faults=None, token=None):
+        super().__init__(address, MockRequestHandler)
+        self.backend = backend
+        self.faults = faults or Faults()
+        self.token = token
+        self.stats = {"requests": {}, "status_codes": {}, "throttled": 0, "iocs_served": 0}
+        self.stats_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def count(self, method, status_code, iocs=0):
+        with self.stats_lock:
+            self.stats["requests"][method] = self.stats["requests"].get(method, 0) + 1
+            self.stats["status_codes"][str(status_code)] = self.stats["status_codes"].get(str(status_code), 0) + 1
+            self.stats["throttled"] += status_code == 429
+            self.stats["iocs_served"] += iocs
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like the S1 console: the tool reuses its pooled connections
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status_code, body, headers=None):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status_code, detail):
+        self._send(status_code, {"errors": [{"code": status_code * 10000, "detail": detail, "title": self.responses.get(status_code, ("Error",))[0]}]})
+
+    def _handle(self, method):
+        url = urllib.parse.urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        server = self.server
+
+        if method == "GET" and url.path == STATS_PATH:
+            with server.stats_lock:
+                return self._send(200, server.stats)
+        if not url.path.startswith(API_PREFIX):
+            return self._send_error(404, f"Unknown path {url.path}")
+        endpoint = url.path[len(API_PREFIX):].strip("/")
+
+        if server.token and self.headers.get("Authorization") != f"ApiToken {server.token}":
+            server.count(method, 401)
+            return self._send_error(401, "Authentication Failed")
+
+        time.sleep(server.faults.delay())
+        if server.faults.throttled():
+            server.count(method, 429)
+            return self._send(429, {"errors": [{"code": 4290010, "detail": "Too many requests", "title": "Too Many Requests"}]},
+                              {"Retry-After": server.faults.retry_after})
+
+        try:
+            body = json.loads(raw) if raw else None
+        except ValueError:
+            server.count(method, 400)
+            return self._send_error(400, "The body is not valid JSON")
+
+        headers = {}
+        try:
+            if isinstance(server.backend, Recorder):
+                status_code, response, headers = server.backend.answer(method, endpoint, url.query, body, self.headers)
+            elif isinstance(server.backend, FixtureStore):
+                status_code, response, headers = server.backend.answer(method, endpoint, url.query, body)
+            elif endpoint != IOC_ENDPOINT:
+                raise ApiError(404, f"Endpoint {endpoint} is not mocked")
+            elif method == "GET":
+                status_code, response = 200, server.backend.list(dict(urllib.parse.parse_qsl(url.query)))
+            elif method == "POST":
+                status_code, response = 200, server.backend.create(body)
+            else:
+                status_code, response = 200, server.backend.delete(body)
+        except ApiError as e:
+            server.count(method, e.status_code)
+            return self._send_error(e.status_code, e.detail)
+
+        iocs = response.get("data") if method == "GET" and isinstance(response, dict) else None
+        server.count(method, status_code, len(iocs) if isinstance(iocs, list) else 0)
+        self._send(status_code, response, headers)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+def start_server(backend, faults=None, host="127.0.0.1", port=0, token=None):
+    # Serves in a daemon thread and returns the server, for benchmarks and tests running in process.
+    # Port 0 picks a free port, server.url is the value for s1_api. Stop with server.shutdown().
+    server = MockServer((host, port), backend, faults, token)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline stand-in for the SentinelOne threat intelligence API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token", help="Only accept this API token (any token by default)")
+    parser.add_argument("--latency", type=float, default=0, metavar="MS", help="Delay added to every API request")
+    parser.add_argument("--jitter", type=float, default=0, metavar="MS", help="Random variation of the delay, plus or minus")
+    parser.add_argument("--throttle-rate", type=float, default=0, metavar="P", help="Share of the requests answered with 429 (0-1)")
+    parser.add_argument("--max-rps", type=float, default=0, help="Answer 429 above this many requests per second")
+    parser.add_argument("--retry-after", type=float, default=1, metavar="SECONDS", help="Retry-After sent with every 429")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the latency jitter and of the 429 injection")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Serve a synthetic dataset or recorded fixtures")
+    serve.add_argument("--iocs", type=int, default=10000, help="Size of the synthetic dataset")
+    serve.add_argument("--account-id", default="0")
+    serve.add_argument("--replay", metavar="DIR", help="Answer with the fixtures recorded in DIR")
+
+    record = commands.add_parser("record", help="Proxy a real tenant and record fixtures")
+    record.add_argument("--upstream", required=True, help="S1 API url, as s1_api in config.yml")
+    record.add_argument("--out", required=True, metavar="DIR", help="Folder of the fixture files")
+
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "record":
+            backend = Recorder(args.upstream, args.out)
+            description = f"Recording {backend.upstream} to {args.out}"
+        elif args.replay:
+            backend = FixtureStore(args.replay)
+            description = f"Replaying {len(backend)} fixtures from {args.replay}"
+        else:
+            backend = SyntheticStore(args.iocs, args.account_id)
+            description = f"Serving {args.iocs} synthetic IOCs"
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    faults = Faults(args.latency, args.jitter, args.throttle_rate, args.max_rps, args.retry_after, args.seed)
+    server = MockServer((args.host, args.port), backend, faults, args.token)
+    print(f"{description} on {server.url} (set s1_api in config.yml to this url). Ctrl+C to stop.", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
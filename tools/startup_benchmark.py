@@ -0,0 +1,98 @@
+import argparse, json, os, statistics, subprocess, sys, time
+
+# Measures how long the tool takes to start, every run in a fresh interpreter so nothing is cached.
+# Run it from the folder holding config/config.yml, like the tool itself:
+#   python tools/startup_benchmark.py [--mode gui|cli] [--runs 5] [--importtime 15]
+# gui: time to import the GUI, to build the main window (table filled from the local DB) and to
+#      its first paint. The first sync is queued, never awaited. Needs a display.
+# cli: time to import the command line mode and build its parser.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def child(mode):
+    # Runs inside the measured interpreter, prints the stage timings as JSON on the last line
+    started = time.perf_counter()
+    stages = {}
+
+    if mode == "cli":
+        from cli.cli_app import build_parser
+        stages["imports"] = time.perf_counter() - started
+        build_parser()
+        stages["parser"] = time.perf_counter() - started
+    else:
+        from gui import ViewerAppWindow
+        stages["imports"] = time.perf_counter() - started
+        try:
+            app = ViewerAppWindow()
+        except Exception as e:
+            # No display: only the imports can be measured
+            stages["error"] = f"{type(e).__name__}: {e}"
+        else:
+            stages["window"] = time.perf_counter() - started
+            app.update()
+            stages["first_paint"] = time.perf_counter() - started
+            app.on_close()
+
+    print(json.dumps(stages), flush=True)
+    # Do not wait for the background sync or the log writer, they are not part of the startup
+    os._exit(0)
+
+def run_once(mode, importtime=False):
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += [os.path.abspath(__file__), "--child", mode]
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    started = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, env=env)
+    wall = time.perf_counter() - started
+
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(f"The measured process failed:\n{result.stderr.strip()}")
+    stages = json.loads(lines[-1])
+    stages["process"] = wall
+    return stages, result.stderr
+
+def slowest_imports(stderr, top):
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports.append((int(cumulative), name.rstrip()))
+    return sorted(imports, reverse=True)[:top]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the startup time of S1_IOC_manager.")
+    parser.add_argument("--mode", choices=("gui", "cli"), default="gui")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--importtime", type=int, default=0, metavar="N", help="Also list the N slowest imports of one run")
+    parser.add_argument("--child", choices=("gui", "cli"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.child)
+
+    runs = [run_once(args.mode)[0] for _ in range(args.runs)]
+    if "error" in runs[0]:
+        print(f"The window could not be created ({runs[0]['error']}), only the imports are measured.")
+
+    print(f"{args.mode} startup over {args.runs} runs (ms, every stage includes the previous ones):")
+    print(f"{'stage':<12} {'min':>8} {'median':>8} {'max':>8}")
+    for stage in ("imports", "parser", "window", "first_paint", "process"):
+        values = [run[stage] * 1000 for run in runs if stage in run]
+        if values:
+            print(f"{stage:<12} {min(values):>8.1f} {statistics.median(values):>8.1f} {max(values):>8.1f}")
+
+    if args.importtime:
+        _, stderr = run_once(args.mode, importtime=True)
+        print("\nSlowest imports (cumulative ms):")
+        for cumulative, name in slowest_imports(stderr, args.importtime):
+            print(f"{cumulative / 1000:>8.1f}  {name}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
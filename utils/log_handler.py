@@ -1,3 +1,4 @@
+import atexit, json, os, queue, threading, time
 from datetime import datetime
 from config.config_loader import config
 
@@ -9,47 +10,216 @@ class Colors: # You may need to change color settings
     GREEN = '\033[32m'
 
     @staticmethod
-    def print_warning(text:str):
-        print(f"{Colors.YELLOW}{text}{Colors.ENDC}")
+    def print_warning(text:str, file=None):
+        print(f"{Colors.YELLOW}{text}{Colors.ENDC}", file=file)
 
     @staticmethod
-    def print_error(text:str):
-        print(f"{Colors.RED}{text}{Colors.ENDC}")
+    def print_error(text:str, file=None):
+        print(f"{Colors.RED}{text}{Colors.ENDC}", file=file)
 
     @staticmethod
-    def print_debug(text:str):
-        print(f"{Colors.BLUE}{text}{Colors.ENDC}")
+    def print_debug(text:str, file=None):
+        print(f"{Colors.BLUE}{text}{Colors.ENDC}", file=file)
 
     @staticmethod
-    def print_success(text:str):
-        print(f"{Colors.GREEN}{text}{Colors.ENDC}")
+    def print_success(text:str, file=None):
+        print(f"{Colors.GREEN}{text}{Colors.ENDC}", file=file)
+
+    @staticmethod
+    def print_info(text:str, file=None):
+        print(f"{text}", file=file)
+
+
+class LogWriter(threading.Thread):
+    # Background writer of the log file. Callers only push records to a queue: the file is kept
+    # open, written in batches, flushed every flush_interval seconds and rotated by size or age.
+    # Every line is a JSON object: {"time", "level", "module", "message"}.
+
+    def __init__(self, path, max_bytes, rotate_seconds, backup_count, flush_interval):
+        super().__init__(name="S1_IOC_log_writer", daemon=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.records = queue.Queue()
+        self.stopped = threading.Event()
+
+        # Every run starts on a fresh file, the previous one is kept as the first backup
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            self._shift_backups()
+        self._open()
+
+    def _open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.opened_at = time.time()
+
+    def _shift_backups(self):
+        # S1_IOC_manager.log -> .log.1 -> .log.2 ... the oldest one is dropped
+        for index in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _rotate_if_needed(self):
+        too_big = self.max_bytes > 0 and self.file.tell() >= self.max_bytes
+        too_old = self.rotate_seconds > 0 and time.time() - self.opened_at >= self.rotate_seconds
+        if too_big or too_old:
+            self.file.close()
+            self._shift_backups()
+            self._open()
+
+    def write(self, record):
+        self.records.put(record)
+
+    def run(self):
+        while not (self.stopped.is_set() and self.records.empty()):
+            try:
+                record = self.records.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            # Drain everything queued so far in a single write
+            lines = [record]
+            while True:
+                try:
+                    lines.append(self.records.get_nowait())
+                except queue.Empty:
+                    break
+
+            self.file.write("".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines))
+            self.file.flush()
+            self._rotate_if_needed()
+
+        self.file.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join(timeout=5)
+
+
+# Numeric severities, a message is emitted when its level is >= the configured one
+DEBUG = 10
+INFO = 20
+SUCCESS = 25
+WARNING = 30
+ERROR = 40
+DISABLED = 100
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", SUCCESS: "SUCCESS", WARNING: "WARNING", ERROR: "ERROR"}
+LEVEL_VALUES = {name: level for level, name in LEVEL_NAMES.items()}
+
+LEVEL_COLORS = {
+    DEBUG: Colors.print_debug,
+    INFO: Colors.print_info,
+    SUCCESS: Colors.print_success,
+    WARNING: Colors.print_warning,
+    ERROR: Colors.print_error
+}
+
+def parse_level(message:str):
+    # Severity of a legacy "[LEVEL] text" message: only a leading prefix counts, so an IOC value
+    # containing "ERROR" does not change it. Returns (level, text without the prefix).
+    if message.startswith("["):
+        end = message.find("]")
+        level = LEVEL_VALUES.get(message[1:end]) if end > 0 else None
+        if level is not None:
+            return level, message[end + 1:].lstrip()
+    return INFO, message
+
+
+class ModuleLogger:
+    # Per-module logger: log = logger.get_logger(__name__)
+    # Arguments are %-formatted only when the message is emitted, so a suppressed
+    # message costs a single integer comparison.
+    def __init__(self, root, name):
+        self.root = root
+        self.name = name
+
+    def log(self, level, message, *args):
+        if level >= self.root.level:
+            self.root.emit(level, self.name, message, args)
+
+    def debug(self, message, *args):
+        if DEBUG >= self.root.level:
+            self.root.emit(DEBUG, self.name, message, args)
+
+    def info(self, message, *args):
+        if INFO >= self.root.level:
+            self.root.emit(INFO, self.name, message, args)
+
+    def success(self, message, *args):
+        if SUCCESS >= self.root.level:
+            self.root.emit(SUCCESS, self.name, message, args)
+
+    def warning(self, message, *args):
+        if WARNING >= self.root.level:
+            self.root.emit(WARNING, self.name, message, args)
+
+    def error(self, message, *args):
+        if ERROR >= self.root.level:
+            self.root.emit(ERROR, self.name, message, args)
 
-    @staticmethod  
-    def print_info(text:str):
-        print(f"{text}")
-    
 
 class Logger:
     def __init__(self):
-        self.log_file = open("./S1_IOC_manager.log", "w")
-    
-    def print_log(self, message:str):
-        if config.debug:
-            message = f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {message}"
-            
-            if("INFO" in message):
-                Colors.print_info(message)
-            elif("ERROR" in message):
-                Colors.print_error(message)
-            elif("SUCCESS" in message):
-                Colors.print_success(message)
-            elif("WARNING" in message):
-                Colors.print_warning(message)
-            else:
-                Colors.print_debug(message)
-
-            self.log_file = open("./S1_IOC_manager.log", "a")
-            self.log_file.write(f"{message}\n")
-            self.log_file.close()
-
-logger = Logger()
\ No newline at end of file
+        # Nothing is read or opened at import time: until the first message the threshold lets
+        # everything through to emit, which then reads config.yml and re-checks the real level.
+        self.level = DEBUG
+        self.configured = False
+        self.loggers = {}
+        self.console = None  # Console stream, None is stdout. The command line mode moves it to stderr
+        self.writer = None
+        self.lock = threading.Lock()
+
+    def configure(self):
+        if self.configured:
+            return
+        with self.lock:
+            if not self.configured:
+                # debug: false keeps everything quiet, otherwise log_level sets the threshold
+                self.level = LEVEL_VALUES.get(str(config.get("log_level", "DEBUG")).upper(), DEBUG) if config.debug else DISABLED
+                self.configured = True
+
+    def _get_writer(self):
+        # The log file is opened (and the previous run rotated) by the first emitted message
+        if self.writer is None:
+            with self.lock:
+                if self.writer is None:
+                    writer = LogWriter(path=config.get("log_file", "./S1_IOC_manager.log"),
+                                       max_bytes=config.get("log_max_bytes", 5 * 1024 * 1024),
+                                       rotate_seconds=config.get("log_rotate_hours", 24) * 3600,
+                                       backup_count=config.get("log_backup_count", 5),
+                                       flush_interval=config.get("log_flush_interval", 1.0))
+                    writer.start()
+                    atexit.register(self.close)
+                    self.writer = writer
+        return self.writer
+
+    def get_logger(self, name):
+        if name not in self.loggers:
+            self.loggers[name] = ModuleLogger(self, name)
+        return self.loggers[name]
+
+    def emit(self, level, module, message, args):
+        if not self.configured:
+            self.configure()
+            if level < self.level:
+                return
+        if args:
+            message = message % args
+        message = f"[{LEVEL_NAMES[level]}] {message}"
+
+        now = datetime.now()
+        LEVEL_COLORS[level](f"{now.strftime('%Y-%m-%d %H:%M:%S')} - {message}", self.console)
+        self._get_writer().write({"time": now.isoformat(timespec="milliseconds"), "level": LEVEL_NAMES[level], "module": module, "message": message})
+
+    def close(self):
+        # Flushes whatever is still queued, called at exit
+        if self.writer is not None and self.writer.is_alive():
+            self.writer.stop()
+
+logger = Logger()
@@ -0,0 +1,39 @@
+import calendar, time
+
+from datetime import datetime, timezone
+
+DISPLAY_FORMAT = "%d/%m/%Y %H:%M:%S"
+
+# Epoch of every "YYYY-MM-DDTHH:MM" prefix already seen. A sync page shares a handful of them
+# (pages are sorted by updatedAt, uploads share their validUntil), so most timestamps cost one lookup.
+MINUTE_CACHE = {}
+MINUTE_CACHE_SIZE = 100000
+
+def parse_s1_time(value):
+    # Converts an S1 timestamp ("2024-05-01T12:34:56.123456Z") to epoch seconds (UTC).
+    # The fixed format is sliced directly, anything else goes through fromisoformat.
+    if not value:
+        return None
+
+    try:
+        if len(value) >= 19 and value[10] == "T" and (len(value) == 19 or value[-1] == "Z"):
+            minute = MINUTE_CACHE.get(value[:16])
+            if minute is None:
+                if len(MINUTE_CACHE) >= MINUTE_CACHE_SIZE:
+                    MINUTE_CACHE.clear()
+                minute = MINUTE_CACHE[value[:16]] = calendar.timegm((int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                                                                     int(value[11:13]), int(value[14:16]), 0, 0, 0, 0))
+            return minute + int(value[17:19])
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        # S1 sends UTC: a value without offset must not be read as local time
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp())
+    except (ValueError, TypeError):
+        return None
+
+def format_timestamp(epoch):
+    # Display format of the table, in UTC as sent by S1
+    if epoch is None or epoch == "":
+        return ""
+    return time.strftime(DISPLAY_FORMAT, time.gmtime(epoch))